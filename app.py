@@ -0,0 +1,151 @@
+"""
+Module related to the construction of the Dash app : layout, page routing and registration of every callback.
+
+It is run by __main__.py (development server) and wsgi.py (production).
+"""
+
+import warnings
+
+import dash, dash_bootstrap_components as dbc
+
+from dash import dcc, html
+from dash.dependencies import Input, Output
+from homepage.homepage_layout import home_layout
+from pre_ten.pre_ten_layout import register_pre_ten_layout_callbacks, pre_ten_layout
+from post_twenty.post_twenty_layout import register_post_twenty_layout_callbacks, post_twenty_layout
+from overall_scrap.overall_scrap_layout import overall_scrap_layout_callbacks, overall_scrap_layout
+from utils import PASSWORD
+from clientside import register_toggle
+from metrics import instrument_callbacks
+
+warnings.filterwarnings('ignore')
+
+app = dash.Dash(
+    __name__, 
+    suppress_callback_exceptions=True, 
+    external_stylesheets=[
+        dbc.themes.FLATLY, 
+        dbc.themes.BOOTSTRAP, 
+        dbc.icons.BOOTSTRAP, 
+        '/assets/bootstrap.min.css', 
+        '/assets/styles.css'
+        ]
+    )
+
+# WSGI application, served by gunicorn / waitress (see wsgi.py)
+server = app.server
+
+# Collapse Button of Dashboard
+register_toggle(app, "collapse", ["collapse-button"])
+
+# Filter Options 1 to 7 of Dashboard, modal i is toggled by the buttons open i and close i
+for i in range(1, 8):
+    register_toggle(app, f"modal{i}", [f"open{i}", f"close{i}"])
+
+app.layout = html.Div([ 
+        dcc.Location(id="url"),
+        html.Div(id='dynamic-layout'),
+    ])
+
+@app.callback(
+    Output('dynamic-layout', 'children'),
+    Input('url', 'search')
+)
+def update_layout(search):
+    if search != PASSWORD:
+        return html.Div([ 
+        html.Div(className='hover-trigger'),
+        
+        # Sidebar
+        html.Div(id="sidebar", className="sidebar", children=[
+            html.H2("Q-Dot Scrap Data", className='my-4'),
+            html.Hr(),
+            dbc.Nav([ 
+                # Home Page Button
+                dbc.NavLink("Home Page", href="/", active="exact"),
+
+                # Scraps Button
+                dbc.NavLink("Scraps", id="collapse-button", className="mb-3"),
+
+                dbc.Collapse(dbc.Nav([
+                    # pre-Ten Access
+                    dbc.NavLink("pre-Ten", href="/mu", active="exact"),
+
+                    # Post-Processing Access
+                    dbc.NavLink("Post Processing", href="/pp", active="exact"),
+
+                    # Global Scraps Access
+                    dbc.NavLink("Global", href="/os", active="exact"),
+
+                ]), id="collapse", is_open=False),
+            ], vertical=True, pills=True),
+        ]),
+
+        html.Div(id="page-content", style={"padding": "2rem 1rem"}),
+    ])
+    else:
+        return html.Div([ 
+        html.Div(className='hover-trigger'),
+        
+        # Sidebar
+        html.Div(id="sidebar", className="sidebar", children=[
+            html.H2("Scrap Data", className='my-4'),
+            html.Hr(),
+            dbc.Nav([ 
+                # Home Page Button
+                dbc.NavLink("Home Page", href="/", active="exact"),
+
+                # Scraps Button
+                dbc.NavLink("Scraps", id="collapse-button", className="mb-3"),
+
+                dbc.Collapse(dbc.Nav([
+                    # pre-Ten Access
+                    dbc.NavLink("pre-Ten", href="/mu?admin", active="exact"),
+
+                    # Post-Processing Access
+                    dbc.NavLink("Post Processing", href="/pp?admin", active="exact"),
+
+                    # Global Scraps Access
+                    dbc.NavLink("Global", href="/os?admin", active="exact"),
+
+                ]), id="collapse", is_open=False),
+            ], vertical=True, pills=True),
+        ]),
+
+        html.Div(id="page-content", style={"padding": "2rem 1rem"}),
+    ])
+
+
+register_pre_ten_layout_callbacks(app)
+register_post_twenty_layout_callbacks(app)
+overall_scrap_layout_callbacks(app)
+
+@app.callback(
+    Output('page-content', 'children'),
+    [
+    Input('url', 'pathname'),
+    Input('url', 'search')
+    ]
+)
+def render_page_content(pathname, search):
+    if pathname in ["/", "/ho"]:
+        return home_layout()
+    elif (pathname == "/mu") and (search  == PASSWORD):
+        return pre_ten_layout(operator_show = True)
+    elif (pathname == "/os") and (search  == PASSWORD):
+        return overall_scrap_layout(operator_show = True)
+    elif pathname == "/mu":
+        return pre_ten_layout(operator_show = False)
+    elif pathname == "/pp":
+        return post_twenty_layout()
+    elif pathname == "/os":
+        return overall_scrap_layout(operator_show = False)
+    else:
+        return html.Div([
+            html.H3("404 Error: Page not found"),
+            html.P(f"The requested path '{pathname}' is not a valid page."),
+            html.P(f"Query parameters: {search}"),
+        ])
+
+# Every callback is registered, time them and serve /metrics
+instrument_callbacks(app)
@@ -0,0 +1,15 @@
+// Callbacks run in the browser, registered from clientside.py.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ui: {
+        // Copy a figure already delivered to the browser, nothing to copy before the graph callback has answered.
+        mirror_figure: function(figure) {
+            return figure || window.dash_clientside.no_update;
+        },
+
+        // Flip the boolean (last argument, the State) as soon as one of the buttons has been clicked.
+        toggle: function(...args) {
+            const is_open = args.pop();
+            return args.some(Boolean) ? !is_open : is_open;
+        }
+    }
+});
@@ -0,0 +1,39 @@
+"""
+Module related to the callbacks run in the background, outside of the HTTP workers (the ERP graphs).
+
+Their jobs run in separate processes started by a DiskcacheManager, which keeps the jobs and their results in a
+diskcache folder (no broker to run). While a job runs, the graph is dimmed (graph-loading class of assets/styles.css).
+A new job of the same callback (changed filters) terminates the previous one, and so does leaving the page.
+Results are keyed on the inputs and on the version of database2.db, so they are shared by every worker
+and dropped when the ERP extract is ingested again.
+"""
+
+import os, diskcache
+
+from dash import DiskcacheManager
+from dash.dependencies import Input, Output
+
+from cache import database_version
+from db import DATA_DIR, database_path
+
+BACKGROUND_CACHE_DIR = os.path.abspath(os.environ.get('DASHBOARD_CACHE_DIR', os.path.join(DATA_DIR, 'cache')))
+BACKGROUND_EXPIRE = 24 * 3600 # Seconds a result is kept
+
+def erp_version():
+    return repr(database_version(database_path('database2.db')))
+
+BACKGROUND_MANAGER = DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_DIR), cache_by=[erp_version], expire=BACKGROUND_EXPIRE)
+
+def background_graph(graph_id):
+    """
+    Args:
+        graph_id (str): id of the graph whose figure the callback returns
+    Returns:
+        options (dict): keyword arguments of app.callback running the callback in the background
+    """
+    return dict(
+        background=True,
+        manager=BACKGROUND_MANAGER,
+        running=[(Output(graph_id, 'className'), 'graph-loading', '')],
+        cancel=[Input('url', 'pathname')],
+    )
@@ -0,0 +1,59 @@
+"""
+Benchmark of the vectorized feature extraction (features.py) against the row-wise apply of utils.py.
+
+Run from the repository root : python -m benchmarks.bench_features [sizes...]
+"""
+
+import sys, time
+
+import pandas as pd, numpy as np
+
+from dicts import SHIFT_DICT
+from utils import assign_team, assign_weekday
+from features import compute_team, compute_weekday, compute_production_week
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+def make_df(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_rows), unit='D')
+    return pd.DataFrame({
+        'Date': dates,
+        'Shift': rng.integers(0, 3, n_rows),
+        'Operator': rng.choice(['AAA', 'BBB', 'CCC', 'WWW', 'DRD', 'ESI', 'TAAA'], n_rows),
+    })
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def row_wise(df):
+    # Same steps as pp_load.load_pp_data before the vectorization.
+    df = df.copy()
+    df['Week'] = np.where((df['Date'].dt.dayofweek == 6) & (df['Shift'] != 2), (df['Date'] + pd.DateOffset(days=-1)).dt.to_period('W-SAT').dt.week, df['Date'].dt.to_period('W-SAT').dt.week)
+    df['Team'] = df.apply(assign_team, axis=1)
+    df['Shift'] = df['Shift'].map(SHIFT_DICT)
+    df['Weekday'] = df.apply(assign_weekday, axis=1)
+    return df
+
+def vectorized(df):
+    df = df.copy()
+    df['Week'] = compute_production_week(df)
+    df['Team'] = compute_team(df)
+    df['Shift'] = df['Shift'].map(SHIFT_DICT)
+    df['Weekday'] = compute_weekday(df)
+    return df
+
+def main(sizes):
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for n_rows in sizes:
+        df = make_df(n_rows)
+        expected, t_row = timed(row_wise, df)
+        result, t_vec = timed(vectorized, df)
+        for col in ['Team', 'Weekday', 'Week']:
+            assert (expected[col].values == result[col].values).all(), col
+        print(f'{n_rows:>10} {t_row:>14.3f} {t_vec:>16.4f} {t_row / t_vec:>8.0f}x')
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
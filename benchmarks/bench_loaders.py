@@ -0,0 +1,83 @@
+"""
+Benchmarks of the loaders, of filter_dataframe and of every callback body, on the synthetic dataset (see conftest.py).
+
+Run from the repository root, after pip install -r requirements-dev.txt : BENCH_ROWS=100000 python -m pytest benchmarks/bench_loaders.py
+(pytest-benchmark : --benchmark-autosave on the reference, then --benchmark-compare --benchmark-compare-fail=mean:20%)
+The loaders are timed without their cache (the memory of their result is kept in extra_info), and the callbacks with every loader cache emptied before each round.
+"""
+
+import calendar, inspect
+
+import pytest
+
+from app import app
+from cache import CACHES, frame_memory
+from dicts import EQUIPMENTS_PER_OPERATOR_LIST
+from smc_load import load_df_smc
+from pp_load import load_pp_data
+from erp_load import df_erp_load
+from utils import extract_type
+from filters import filter_dataframe
+from metrics import callback_name
+
+INPUT_VALUES = {'Year': 2024, 'Week': [1, 52], 'Shift': 'All'}
+
+FILTERS = dict(INPUT_VALUES, Operator='AAA', Equipment='All', Weekday=list(calendar.day_name)[:5], **{'Equipments per Operator': [1, 2]})
+
+ROUNDS = 5
+
+# Server callbacks, by output (the browser ones never reach Python)
+CALLBACKS = {callback_name(output): callback for output, callback in app.callback_map.items() if 'callback' in callback}
+
+# Callbacks raising on the synthetic dataset, benchmarked once fixed
+KNOWN_FAILURES = {
+    'NOK (%) from each Ten Equipment per Op': "the equipment colors are looked up with equip[:4] and 'Ten' is not an OPERATIONS_LIST category",
+    '60: NOK by Type per Collaborator': "NULL collaborators ('N/A' in the extract) become a null category",
+}
+
+def clear_caches():
+    for cache in CACHES.values():
+        cache.clear()
+
+def default_value(component_id, prop):
+    # Default values of the filters of the layouts, over the whole year
+    if component_id.startswith(('Year Dropdown', 'Year Selector')):
+        return INPUT_VALUES['Year']
+    if component_id.startswith('Week Selector'):
+        return INPUT_VALUES['Week']
+    if component_id.startswith('Weekday Dropdown'):
+        return list(calendar.day_name)
+    if component_id.startswith('Equipments Per Operator'):
+        return EQUIPMENTS_PER_OPERATOR_LIST
+    if 'Dropdown' in component_id:
+        return 'All'
+    if component_id == 'url':
+        return '?admin' if prop == 'search' else '/mu'
+    return None
+
+def test_load_df_smc(benchmark):
+    result = benchmark(load_df_smc.__wrapped__, INPUT_VALUES)
+    benchmark.extra_info['bytes'] = frame_memory(result)
+
+def test_load_pp_data(benchmark):
+    result = benchmark(load_pp_data.__wrapped__, INPUT_VALUES)
+    benchmark.extra_info['bytes'] = frame_memory(result)
+
+def test_df_erp_load(benchmark):
+    result = benchmark(df_erp_load.__wrapped__, INPUT_VALUES)
+    benchmark.extra_info['bytes'] = frame_memory(result)
+
+def test_extract_type(benchmark):
+    df_pp, _ = load_pp_data(INPUT_VALUES)
+    benchmark(extract_type, df_pp)
+
+def test_filter_dataframe(benchmark):
+    df_smc = load_df_smc(INPUT_VALUES)
+    benchmark(filter_dataframe, df_smc, FILTERS)
+
+@pytest.mark.parametrize('name', [pytest.param(name, marks=pytest.mark.xfail(reason=KNOWN_FAILURES[name])) if name in KNOWN_FAILURES else name for name in sorted(CALLBACKS)])
+def test_callback(benchmark, name):
+    callback = CALLBACKS[name]
+    func = inspect.unwrap(callback['callback'])
+    args = [default_value(str(dependency['id']), dependency['property']) for dependency in callback['inputs'] + callback.get('state', [])]
+    benchmark.pedantic(func, args=args, setup=clear_caches, rounds=ROUNDS)
@@ -0,0 +1,66 @@
+"""
+Benchmark of generate_plots.generate_grouped_bar_plot (one groupby pass) against the former loop masking the frame for every hue.
+
+Run from the repository root : python -m benchmarks.bench_plots [hue counts...]
+The Operator hue is used, the costliest one (team colors). The bar limit of large plots (generate_plots.MAX_BARS) is lifted,
+so that every hue keeps its trace.
+"""
+
+import sys, time, json
+
+import plotly.graph_objects as go, plotly.io as pio, pandas as pd, numpy as np
+
+import generate_plots
+
+from generate_plots import generate_grouped_bar_plot, add_ceil_trace, update_layout, ceil_value
+from smc_load import load_color_dict_operator
+
+HUE_COUNTS = [5, 20, 100, 500]
+WEEKS = 52
+ROWS_PER_WEEK = 3 # Rows of each operator per week
+
+TITLE = 'Ten: NOK per Operator per week'
+
+def make_df(n_hues, seed=0):
+    rng = np.random.default_rng(seed)
+    operators = np.array([f'OP{i:03d}' for i in range(n_hues)])
+    n_rows = n_hues * WEEKS * ROWS_PER_WEEK
+    weeks = np.tile(np.repeat(np.arange(1, WEEKS + 1), ROWS_PER_WEEK), n_hues)
+    return pd.DataFrame({
+        'Week': weeks,
+        'Operator': np.repeat(operators, WEEKS * ROWS_PER_WEEK),
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta((weeks - 1) * 7 + rng.integers(0, 7, n_rows), unit='D'),
+        'Team': np.repeat(np.arange(n_hues) % 4, WEEKS * ROWS_PER_WEEK), # One team per operator, the color of an operator is its last team
+        'NOK': rng.integers(0, 20, n_rows),
+    }).sample(frac=1, random_state=seed, ignore_index=True)
+
+def per_hue(df_, x, hue_col, title, xlabel, ylabel, xlabel_rotation=315, filtered_df=False):
+    # Operator branch of generate_grouped_bar_plot before the single pass.
+    fig = go.Figure()
+    for hue in filtered_df[hue_col].unique():
+        df_subset = filtered_df[filtered_df[hue_col] == hue]
+        color = load_color_dict_operator(df_subset).get(hue, 'black')
+        fig.add_trace(go.Bar(x=df_subset[x], y=df_subset[ylabel], name=str(hue), opacity=0.65, marker=dict(color=color), hovertemplate='%{y:.0f}', width=0.8))
+    add_ceil_trace(fig, df_, x, title, ceil_value(title))
+    update_layout(x, df_, fig, title, xlabel, ylabel, xlabel_rotation)
+    fig.update_xaxes(tick0=0, dtick=1, title_standoff=30)
+    return fig
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main(hue_counts):
+    generate_plots.MAX_BARS = float('inf')
+    print(f"{'hues':>6} {'rows':>8} {'per hue (s)':>12} {'single pass (s)':>16} {'speedup':>8}")
+    for n_hues in hue_counts:
+        df = make_df(n_hues)
+        args = (df, 'Week', 'Operator', TITLE, 'Weeks', 'NOK', 315, df)
+        expected, t_loop = timed(per_hue, *args)
+        result, t_pass = timed(generate_grouped_bar_plot, *args)
+        assert json.loads(pio.to_json(expected)) == json.loads(pio.to_json(result))
+        print(f'{n_hues:>6} {len(df):>8} {t_loop:>12.3f} {t_pass:>16.3f} {t_loop / t_pass:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or HUE_COUNTS)
@@ -0,0 +1,77 @@
+"""
+Benchmark of reconciliation.compute_reconciliation (one vectorized pass) against the former smc_load.load_df_smc_cons_mismatch
+(a regex and a pd.Series per row through apply, then iterrows growing the mismatch frame).
+
+Run from the repository root : python -m benchmarks.bench_reconciliation [row counts...]
+The uu_tracking rows are generated here, a third of them with #CONS codes in their comments. Both sides must flag the
+same rows as CONS mismatches.
+"""
+
+import sys, time, re, json
+
+import pandas as pd, numpy as np
+
+from reconciliation import compute_reconciliation, BUCKETS
+
+ROW_COUNTS = [1_000, 5_000, 20_000]
+
+def make_df(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    buckets = {bucket: rng.integers(0, 3, n_rows) for bucket in BUCKETS}
+    codes = rng.integers(0, 4, n_rows) * (rng.random(n_rows) < 0.33)
+    comments = [' '.join(f'#CONS-00{rng.integers(1, 20)}#{rng.choice(list("COU"))}#{rng.integers(0, 5)}' for _ in range(count)) for count in codes]
+    nok = buckets['d0'] + buckets['d3'] + rng.integers(0, 4, n_rows) * (rng.random(n_rows) < 0.5)
+    return pd.DataFrame({
+        'row_key': np.arange(n_rows).astype(str),
+        'dte': (pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D')).strftime('%Y-%m-%d'),
+        'shift': rng.integers(0, 3, n_rows),
+        'operator': rng.choice(['AAA', 'BBB', 'CCC'], n_rows),
+        'equipment': rng.choice(['Equipment10', 'Equipment3'], n_rows),
+        'ofa': 'ofa-1',
+        'operation': None,
+        'qty_ko': nok,
+        **buckets,
+        'defaults': [json.dumps({'d1': int(value)}) for value in nok],
+        'comments': comments,
+    })
+
+def legacy_mismatch(df):
+    # load_df_smc_cons then load_df_smc_cons_mismatch before the reconciliation table, on the loader's columns.
+    df = df.rename(columns={'row_key': 'Number', 'qty_ko': 'NOK', 'comments': 'Comments', 'd0': 'A', 'd3': 'R'})
+    pattern = r'(#CONS-00)(\d+)(#)([COU])(#)(\d+)'
+
+    def process_row(row):
+        matches = re.findall(pattern, row.Comments)
+        c_dict, o_dict, u_dict = {}, {}, {}
+        for match in matches:
+            cons, type_let, qt_rebuts = match[1], match[3], match[5]
+            if type_let == "C": c_dict[cons] = (int(qt_rebuts), 'NA')
+            elif type_let == "O": o_dict[cons] = (int(qt_rebuts), 'NA')
+            elif type_let == "U": u_dict[cons] = (int(qt_rebuts), 'NA')
+        return pd.Series([c_dict, o_dict, u_dict], index=['C', 'O', 'U'])
+
+    df[['C', 'O', 'U']] = df.apply(process_row, axis=1)
+    df_mismatch = pd.DataFrame()
+    for _, row in df.iterrows():
+        sum_rebuts = sum([val[0] for val in row['C'].values()] + [val[0] for val in row['O'].values()] + [val[0] for val in row['U'].values()] + list(row[['R', 'A']].values))
+        if sum_rebuts != row['NOK']:
+            df_mismatch = df_mismatch._append(row)
+    return df_mismatch
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main(row_counts):
+    print(f"{'rows':>8} {'mismatches':>11} {'per row (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for n_rows in row_counts:
+        df = make_df(n_rows)
+        expected, t_loop = timed(legacy_mismatch, df)
+        result, t_pass = timed(compute_reconciliation, df, 'uu_tracking')
+        flagged = result.loc[result['cons_mismatch'] == 1, 'row_key']
+        assert sorted(flagged) == sorted(expected['Number'] if len(expected) else [])
+        print(f'{n_rows:>8} {len(flagged):>11} {t_loop:>12.3f} {t_pass:>15.3f} {t_loop / t_pass:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or ROW_COUNTS)
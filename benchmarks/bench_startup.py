@@ -0,0 +1,51 @@
+"""
+Benchmark of the startup of the dashboard : import time of each module, as reported by python -X importtime.
+
+Run from the repository root : python -m benchmarks.bench_startup [module] [top]
+(module app by default, wsgi to include the warm-up queries, top 25 by default)
+"""
+
+import os, re, sys, time, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+def repo_packages():
+    return {name[:-3] if name.endswith('.py') else name for name in os.listdir(ROOT) if name.endswith('.py') or os.path.isdir(os.path.join(ROOT, name, '__pycache__'))}
+
+def import_times(module):
+    """
+    Args:
+        module (str): module imported in a fresh interpreter
+    Returns:
+        wall_time (float): seconds taken by the whole import
+        times (list): (name, self_us, cumulative_us, depth) of each imported module, in import order
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT, capture_output=True, text=True, check=True)
+    wall_time = time.perf_counter() - start
+    times = []
+    for line in process.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return wall_time, times
+
+def main(module, top):
+    wall_time, times = import_times(module)
+    packages = repo_packages()
+    print(f'import {module}: {wall_time:.2f}s (interpreter included), {len(times)} modules')
+
+    print(f"\n{'top ' + str(top) + ' by cumulative time':<50} {'self (ms)':>10} {'cumulative (ms)':>16}")
+    for name, self_us, cumulative_us, _ in sorted(times, key=lambda row: -row[2])[:top]:
+        print(f'{name:<50} {self_us / 1000:>10.1f} {cumulative_us / 1000:>16.1f}')
+
+    print(f"\n{'modules of the repository':<50} {'self (ms)':>10} {'cumulative (ms)':>16}")
+    for name, self_us, cumulative_us, _ in times:
+        if name.split('.')[0] in packages:
+            print(f'{name:<50} {self_us / 1000:>10.1f} {cumulative_us / 1000:>16.1f}')
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'app', int(sys.argv[2]) if len(sys.argv) > 2 else 25)
@@ -0,0 +1,19 @@
+"""
+Configuration of the pytest-benchmark suite : the loaders read a synthetic dataset of BENCH_ROWS rows
+(10000 by default, see synthetic.py), built on first use in benchmarks/data.
+"""
+
+import os
+
+import pytest
+
+from benchmarks.synthetic import build_databases
+from db import set_data_dir
+
+BENCH_ROWS = int(os.environ.get('BENCH_ROWS', 10_000))
+
+@pytest.fixture(scope='session', autouse=True)
+def synthetic_data():
+    directory = build_databases(BENCH_ROWS)
+    set_data_dir(directory)
+    return directory
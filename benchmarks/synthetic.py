@@ -0,0 +1,205 @@
+"""
+Deterministic synthetic dataset, with the structure of the CSV extracts but at any size.
+
+Run from the repository root : python -m benchmarks.synthetic rows [directory] [seed]
+(e.g. 10000, 100000, 1000000 or 10000000 rows, written to benchmarks/data/<rows> by default)
+
+uu_tracking and pp_tracking get rows rows each, ofas about as many. The ofas are made of families (ofa-1-000042) whose
+-1 ofa is tracked in uu_tracking and pp_tracking and goes through the ERP steps, some of them being followed by a -2
+or -3 ofa. The ERP steps repeat 'Operation 120' and 'Operation 70' (see erp_load.rename_ops), and some ofas skip 60.
+The defaults columns are JSON NOK counts of the defects of prod_defaults, and the dates span YEARS.
+The CSV files are then ingested by create_db.py into database1.db and database2.db of the same folder.
+"""
+
+import os, sys, json, datetime
+
+import pandas as pd, numpy as np
+
+from create_db import TABLES, connect, ingest_table
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+YEARS = (2023, 2024)
+ROWS_PER_FAMILY = 16 # uu_tracking (and pp_tracking) rows per ofa family
+FAMILIES_PER_CHUNK = 50_000 # Families generated (and written) at once
+
+OPERATORS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF', 'GGG', 'HHH', 'III', 'JJJ', 'KKK', 'LLL', 'MMM', 'NNN', 'OOO', 'PPP', 'QQQ', 'RRR', 'SSS', 'TTT', 'UUU', 'VVV', 'WWW', 'XXX', 'YYY', 'ZZZ', 'DRD', 'ESI', 'TAAA', 'WAAA']
+COLLABORATORS = ['N/A'] * 6 + ['SSS', 'TTT', 'UUU', 'VVV', 'WWW', 'XXX', 'YYY', 'ZZZ']
+EQUIPMENTS = ['Equipment1', 'Equipment2', 'Equipment3', 'Equipment10', 'Equipment20', 'Equipment30', 'Equipment100', 'Equipment200', 'Equipment300']
+PP_OPERATIONS = [0, 20, 50, 60, 71, 72, 100, 101]
+PP_OPERATION_WEIGHTS = [0.1, 0.25, 0.1, 0.1, 0.05, 0.05, 0.3, 0.05]
+
+# (def_name, def_descr, def_domain) : defects of the uu10 domain are the ones of uu_tracking, the others of pp_tracking
+DEFECTS = [(f'd{i}', f'default{i}', domain) for i, domain in enumerate(['pp0'] * 6 + ['pp50'] * 6 + ['pp71'] * 8 + ['uu10'] * 20, start=1)]
+
+# ERP steps of an ofa, in the order of the extract : (SCS_STEP_NUMBER, TAS_REF, SCS_SHORT_DESCR, optional)
+ERP_STEPS = [
+    (130, 'OP_130', 'Operation 130', True),
+    (120, 'OP_120', 'Operation 120', False),
+    (110, 'OP_110', 'Operation 110', False),
+    (100, 'OP_100', 'Operation 120', False),
+    (90, 'OP_90', 'Operation 90', False),
+    (70, 'OP_70', 'Operation 70', False),
+    (60, 'OP_90', 'Operation 60', True),
+    (50, 'OP_100', 'Operation 120', False),
+    (40, 'OP_70', 'Operation 70', False),
+    (30, 'OP_30', 'Operation 30', False),
+    (20, 'OP_20', 'Operation 20', False),
+    (10, 'OP_10', 'Ten', False),
+]
+
+def defaults_pool(rng, domain_prefix, size=256):
+    """
+    Returns:
+        defaults (np.ndarray): JSON NOK counts of 1 to 4 defects of the domain
+        nok (np.ndarray): total NOK of each of them
+    """
+    names = [name for name, _, domain in DEFECTS if domain.startswith(domain_prefix)]
+    defaults, nok = [], []
+    for _ in range(size):
+        counts = {str(name): int(rng.integers(1, 6)) for name in rng.choice(names, rng.integers(1, 5), replace=False)}
+        defaults.append(json.dumps(counts, separators=(',', ':')))
+        nok.append(sum(counts.values()))
+    return np.array(defaults, dtype=object), np.array(nok)
+
+def families(rng, first, count):
+    start, end = datetime.date(YEARS[0], 1, 1), datetime.date(YEARS[-1], 12, 31)
+    return pd.DataFrame({
+        'family': [f'ofa-1-{i:06d}' for i in range(first, first + count)],
+        'date': pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, (end - start).days - 30, count), unit='D'),
+        'equipment': rng.choice(EQUIPMENTS, count),
+        'follow_up': rng.choice(['', '-2', '-3'], count, p=[0.7, 0.15, 0.15]),
+    })
+
+def uu_rows(rng, df_family, n_rows, first_id, pool):
+    index = rng.integers(0, len(df_family), n_rows)
+    family = df_family.iloc[index].reset_index(drop=True)
+    dates = family['date'] + pd.to_timedelta(rng.integers(0, 3, n_rows), unit='D')
+    defaults, nok = pool
+    choice = rng.integers(0, len(defaults), n_rows)
+    with_defaults = rng.random(n_rows) < 0.6
+    iso = dates.dt.isocalendar()
+    zeros = np.zeros(n_rows, dtype=int)
+    return pd.DataFrame({
+        'id': np.arange(first_id, first_id + n_rows),
+        'usr': rng.choice(OPERATORS, n_rows),
+        'dte': dates.dt.strftime('%Y-%m-%d'),
+        'shift': rng.integers(0, 3, n_rows),
+        'pdc': np.where(rng.random(n_rows) < 0.99, family['equipment'], rng.choice(EQUIPMENTS, n_rows)),
+        'qty_ok': rng.integers(0, 80, n_rows),
+        'qty_ko': np.where(with_defaults, nok[choice], 0),
+        'd0': zeros, 'd1': zeros, 'd2': zeros, 'd3': zeros, 'd4': zeros, 'd5': zeros, 'd6': zeros,
+        'comments': '',
+        'ofa': family['family'] + np.where(rng.random(n_rows) < 0.95, '-1', '-3'),
+        'week': iso['year'].astype(str) + '-' + iso['week'].astype(str).str.zfill(2),
+        'defaults': np.where(with_defaults, defaults[choice], None),
+    })
+
+def pp_rows(rng, df_family, n_rows, pool):
+    index = rng.integers(0, len(df_family), n_rows)
+    family = df_family.iloc[index].reset_index(drop=True)
+    defaults, nok = pool
+    choice = rng.integers(0, len(defaults), n_rows)
+    with_defaults = rng.random(n_rows) < 0.5
+    return pd.DataFrame({
+        'ofa': family['family'] + '-1',
+        'dte': (family['date'] + pd.to_timedelta(rng.integers(1, 22, n_rows), unit='D')).dt.strftime('%Y-%m-%d'),
+        'uusr': rng.choice(OPERATORS, n_rows),
+        'usr': rng.choice(COLLABORATORS, n_rows),
+        'shift': rng.integers(0, 3, n_rows),
+        'ope': rng.choice(PP_OPERATIONS, n_rows, p=PP_OPERATION_WEIGHTS),
+        'qty_ok': rng.integers(0, 150, n_rows),
+        'qty_ko': np.where(with_defaults, nok[choice], 0),
+        'defaults': np.where(with_defaults, defaults[choice], None),
+        'comments': None,
+    })
+
+def erp_rows(rng, df_family):
+    # One -1 ofa per family, plus its -2 / -3 follow-up (a rework, which goes through the same steps later on)
+    follow_up = df_family[df_family['follow_up'] != '']
+    ofas = pd.concat([
+        pd.DataFrame({'ofa': df_family['family'] + '-1', 'date': df_family['date'], 'equipment': df_family['equipment']}),
+        pd.DataFrame({'ofa': follow_up['family'] + follow_up['follow_up'], 'date': follow_up['date'] + pd.Timedelta(days=7), 'equipment': follow_up['equipment']}),
+    ], ignore_index=True)
+    n_ofas = len(ofas)
+    rows = ofas.loc[ofas.index.repeat(len(ERP_STEPS))].reset_index(drop=True)
+    for column, values in zip(['step', 'ref', 'descr', 'optional'], zip(*ERP_STEPS)):
+        rows[column] = np.tile(values, n_ofas)
+    # The optional steps are only kept for some ofas : 130 for 40% of them, 60 (the sorted ofas) for 60%
+    keep = ~rows['optional'].to_numpy()
+    keep[(rows['step'] == 130).to_numpy()] = rng.random(n_ofas) < 0.4
+    keep[(rows['step'] == 60).to_numpy()] = rng.random(n_ofas) < 0.6
+    rows = rows[keep].reset_index(drop=True)
+    n_rows = len(rows)
+    # The extract lists the steps backwards, step 10 (Ten) comes first
+    begin = rows['date'] + pd.to_timedelta(rows.groupby('ofa').cumcount(ascending=False), unit='h') + pd.to_timedelta(rng.integers(0, 3600, n_rows), unit='s')
+    released = rng.integers(50, 500, n_rows)
+    return pd.DataFrame({
+        'LOT_REFCOMPL': rows['ofa'],
+        'LOT_RELEASED_QTY': released,
+        'LOT_REJECT_RELEASED_QTY': rng.integers(0, 10, n_rows),
+        'FAC_REFERENCE': np.where(rows['step'] == 10, rows['equipment'], 'A' + rows['step'].astype(str)),
+        'SCS_STEP_NUMBER': rows['step'],
+        'TAS_REF': rows['ref'],
+        'SCS_SHORT_DESCR': rows['descr'],
+        'TAL_RELEASE_QTY': released,
+        'TAL_REJECTED_QTY': rng.integers(0, 15, n_rows),
+        'TAL_BEGIN_REAL_DATE': begin.dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'TAL_END_REAL_DATE': (begin + pd.Timedelta(hours=1)).dt.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+def write_csv(df, path, first):
+    df.to_csv(path, sep=';', header=False, index=False, mode='w' if first else 'a')
+
+def generate(n_rows, directory, seed=0):
+    """
+    Args:
+        n_rows (int): rows of uu_tracking and of pp_tracking
+        directory (str): folder of the CSV files, named as the extracts of the csv folder
+        seed (int): same seed and size, same files
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {table: os.path.join(directory, os.path.basename(spec['csv'])) for table, spec in TABLES.items()}
+    rng = np.random.default_rng(seed)
+    uu_pool, pp_pool = defaults_pool(rng, 'uu'), defaults_pool(rng, 'pp')
+    pd.DataFrame([(i, name, descr, domain) for i, (name, descr, domain) in enumerate(DEFECTS, start=1)]).to_csv(paths['prod_defaults'], sep=';', header=False, index=False)
+
+    n_families = max(1, n_rows // ROWS_PER_FAMILY)
+    first_row = 0
+    for first_family in range(0, n_families, FAMILIES_PER_CHUNK):
+        count = min(FAMILIES_PER_CHUNK, n_families - first_family)
+        chunk_rows = n_rows * (first_family + count) // n_families - first_row # The chunks add up to n_rows
+        chunk_rng = np.random.default_rng([seed, first_family])
+        df_family = families(chunk_rng, first_family, count)
+        first = first_family == 0
+        write_csv(uu_rows(chunk_rng, df_family, chunk_rows, first_row + 1, uu_pool), paths['uu_tracking'], first)
+        write_csv(pp_rows(chunk_rng, df_family, chunk_rows, pp_pool), paths['pp_tracking'], first)
+        write_csv(erp_rows(chunk_rng, df_family), paths['ofas'], first)
+        first_row += chunk_rows
+    return paths
+
+def build_databases(n_rows, directory=None, seed=0):
+    """
+    Args:
+        n_rows (int): rows of uu_tracking and of pp_tracking
+        directory (str): folder of the CSV files and of the databases (benchmarks/data/<n_rows> by default)
+        seed (int): seed of generate
+    Returns:
+        directory (str): folder holding database1.db and database2.db, built only once per folder
+    """
+    directory = os.path.abspath(directory or os.path.join(DATA_DIR, str(n_rows)))
+    done = os.path.join(directory, 'done')
+    if os.path.exists(done):
+        return directory
+    paths = generate(n_rows, os.path.join(directory, 'csv'), seed)
+    for table, spec in TABLES.items():
+        spec = dict(spec, csv=paths[table], db=os.path.join(directory, os.path.basename(spec['db'])))
+        conn = connect(spec['db'])
+        rows_written, _ = ingest_table(conn, table, spec, rebuild=True)
+        conn.close()
+        print(f'{table}: {rows_written} rows')
+    open(done, 'w').close()
+    return directory
+
+if __name__ == '__main__':
+    build_databases(int(sys.argv[1]), sys.argv[2] if len(sys.argv) > 2 else None, int(sys.argv[3]) if len(sys.argv) > 3 else 0)
@@ -0,0 +1,183 @@
+"""
+Module related to the in-process caching of the loaded dataframes.
+
+The loaders are keyed on the part of input_values that reaches the SQL query (Year, Week range, Shift),
+every other filter being applied afterwards in pandas by filter_dataframe.
+"""
+
+import os, threading
+
+import pandas as pd
+
+from collections import OrderedDict
+from functools import wraps
+
+from db import database_path
+
+CACHE_MAXSIZE = 8 # Number of filter combinations kept per loader
+
+CACHES = {} # Registry of every cache, by name, for reporting
+
+def normalize_input_values(input_values):
+    """
+    Args:
+        input_values (dict): filter values coming from a callback
+    Returns:
+        key (tuple): hashable (Year, (start_week, end_week), Shift) key
+    """
+    start_week, end_week = input_values['Week']
+    return (input_values['Year'], (start_week, end_week), input_values.get('Shift', 'All'))
+
+def database_version(db_path):
+    """
+    Args:
+        db_path (str): SQLite database, resolved by db.database_path when it is read (see db.set_data_dir)
+    Returns:
+        version (tuple): modification time and size of the database file and of its WAL file
+    """
+    db_path = database_path(db_path)
+    version = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+def copy_result(result):
+    # Callers are free to add columns to what they get back, so never hand out the cached object itself.
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(copy_result(value) for value in result)
+    if isinstance(result, list):
+        return list(result)
+    return result
+
+def frame_memory(result):
+    """
+    Args:
+        result: loader result, a dataframe or a tuple / list holding dataframes
+    Returns:
+        size (int): bytes used by the dataframes, the strings of the object columns included
+    """
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, (tuple, list)):
+        return sum(frame_memory(value) for value in result)
+    return 0
+
+def frame_rows(result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, tuple) and result:
+        return frame_rows(result[0])
+    return None
+
+class DataFrameCache:
+    """
+    Size-bounded LRU cache of loader results, emptied whenever the underlying database file changes.
+    """
+    def __init__(self, name, db_path, maxsize=CACHE_MAXSIZE):
+        self.name = name
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._sizes = {} # key -> (rows, bytes) of each entry, see memory_report
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        CACHES[name] = self
+
+    def current_version(self):
+        version = database_version(self.db_path)
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._sizes.clear()
+                self._version = version
+        return version
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version):
+        size = (frame_rows(value), frame_memory(value))
+        with self._lock:
+            if version != self._version: # The database changed while we were loading
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._sizes[evicted]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def sizes(self):
+        with self._lock:
+            return dict(self._sizes)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'bytes': sum(size for _, size in self._sizes.values()),
+            }
+
+def cached_loader(cache):
+    """
+    Decorator caching a loader taking input_values, then optional hashable positional arguments.
+    """
+    def decorator(loader):
+        @wraps(loader)
+        def wrapper(input_values, *args):
+            key = (normalize_input_values(input_values),) + args
+            version = cache.current_version()
+            result = cache.get(key)
+            if result is None:
+                result = loader(input_values, *args)
+                cache.set(key, result, version)
+            return copy_result(result)
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+def memory_report():
+    """
+    Returns:
+        report (pd.DataFrame): one line per cached frame (cache, key, rows, bytes), largest first.
+                               Every worker process holds its own caches, up to CACHE_MAXSIZE frames per loader.
+    """
+    lines = [(name, key, rows, size) for name, cache in CACHES.items() for key, (rows, size) in cache.sizes().items()]
+    report = pd.DataFrame(lines, columns=['cache', 'key', 'rows', 'bytes'])
+    return report.sort_values('bytes', ascending=False, ignore_index=True)
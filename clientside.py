@@ -0,0 +1,36 @@
+"""
+Module related to the callbacks run in the browser (no round trip to the server).
+
+The functions live in assets/clientside.js, under the 'ui' namespace.
+"""
+
+from dash.dependencies import Input, Output, State, ClientsideFunction
+
+MIRROR_FIGURE = ClientsideFunction(namespace='ui', function_name='mirror_figure')
+
+TOGGLE = ClientsideFunction(namespace='ui', function_name='toggle')
+
+def register_toggle(app, component_id, button_ids, prop='is_open'):
+    """
+    Args:
+        app (dash.Dash): application
+        component_id (str): id of the collapse / modal to open and close
+        button_ids (list): ids of the buttons toggling it (their n_clicks)
+        prop (str): boolean property of the component
+    """
+    app.clientside_callback(
+        TOGGLE,
+        Output(component_id, prop),
+        [Input(button_id, 'n_clicks') for button_id in button_ids],
+        [State(component_id, prop)],
+    )
+
+def register_modal_graphs(app, graph_ids):
+    """
+    Args:
+        app (dash.Dash): application
+        graph_ids (list): ids of the card graphs, each one mirrored into its "<id> (bis)" twin of the filter modal,
+                          so that the server only sends every figure once
+    """
+    for graph_id in graph_ids:
+        app.clientside_callback(MIRROR_FIGURE, Output(graph_id + ' (bis)', 'figure'), Input(graph_id, 'figure'))
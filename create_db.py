@@ -1,206 +1,198 @@
-import sqlite3
+"""
+Module related to the ingestion of the CSV extracts into the SQLite databases.
+
+Usage : python create_db.py [--rebuild] [table ...]
+
+Rows are upserted on their natural identity inside one transaction per table, so re-running on an appended CSV
+only writes the new (or modified) rows. The databases are in WAL mode, so the dashboard keeps reading while we write.
+The weekly rollups of uu_tracking and pp_tracking (see rollups.py) are refreshed in the same transaction,
+for the weeks of the written rows only, and so are the ofa to equipment index (see ofa_index.py) and the NOK
+reconciliation table (see reconciliation.py).
+"""
+
+import argparse, sqlite3, time
 
 import pandas as pd
 
-# Load the CSV data
-df = pd.read_csv('csv/ofas.csv', sep=';') # "ofa"; "dte"; "uusr"; "usr"; "shift"; "ope"; "qty_ok"; "qty_ko"; "defaults"; "comments"
-
-# Define the SQLite database
-conn = sqlite3.connect('database2.db')
-cursor = conn.cursor()
-
-# Drop the table if it already exists
-cursor.execute('DROP TABLE IF EXISTS ofas')
-
-# Create the table
-cursor.execute('''
-CREATE TABLE ofas (
-    LOT_REFCOMPL TEXT, 
-    LOT_RELEASED_QTY INTEGER,
-    LOT_REJECT_RELEASED_QTY INTEGER,
-    FAC_REFERENCE TEXT,
-    SCS_STEP_NUMBER INTEGER,
-    TAS_REF TEXT,
-    SCS_SHORT_DESCR TEXT,
-    TAL_RELEASE_QTY INTEGER,
-    TAL_REJECTED_QTY INTEGER,
-    TAL_BEGIN_REAL_DATE TEXT,
-    TAL_END_REAL_DATE TEXT
-)
-''')
-
-# Process the DataFrame and insert data into the database
-for index, row in df.iterrows():
-    cursor.execute('''
-        INSERT INTO ofas (LOT_REFCOMPL, LOT_RELEASED_QTY, LOT_REJECT_RELEASED_QTY, FAC_REFERENCE, SCS_STEP_NUMBER, TAS_REF, SCS_SHORT_DESCR, TAL_RELEASE_QTY, TAL_REJECTED_QTY, TAL_BEGIN_REAL_DATE, TAL_END_REAL_DATE)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-            row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3], row.iloc[4], row.iloc[5], 
-            row.iloc[6], row.iloc[7], row.iloc[8], row.iloc[9], row.iloc[10]
-        ))
-
-# Commit the transaction and close the connection
-conn.commit()
-conn.close()
-
-# Load the CSV data
-df = pd.read_csv('csv/pp_tracking.csv', sep=';') # ofa; dte; uusr; usr; shift; ope; qty_ok; qty_ko; defaults; comments
-
-# Define the SQLite database
-conn = sqlite3.connect('database1.db')
-cursor = conn.cursor()
-
-# Drop the table if it already exists
-cursor.execute('DROP TABLE IF EXISTS pp_tracking')
-
-# Create the table
-cursor.execute('''
-CREATE TABLE pp_tracking (
-    ofa TEXT,
-    dte TEXT,
-    uusr TEXT,
-    usr TEXT,
-    shift INTEGER,
-    ope TEXT,
-    qty_ok INTEGER,
-    qty_ko INTEGER,
-    defaults TEXT,
-    comments TEXT
-)
-''')
-
-# Process the DataFrame and insert data into the database
-for index, row in df.iterrows():
-    cursor.execute('''
-        INSERT INTO pp_tracking (ofa, dte, uusr, usr, shift, ope, qty_ok, qty_ko, defaults, comments)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3], row.iloc[4], row.iloc[5], 
-          row.iloc[6], row.iloc[7], row.iloc[8], row.iloc[9]
-          ))
-        
-
-# Commit the transaction and close the connection
-conn.commit()
-conn.close()
-
-
-# Load the CSV data
-df = pd.read_csv('csv/defaults.csv', sep=';') # "def_id"; "def_name"; "def_descr"; "def_domain";
-
-# Define the SQLite database
-conn = sqlite3.connect('database1.db')
-cursor = conn.cursor()
-
-# Drop the table if it already exists
-cursor.execute('DROP TABLE IF EXISTS prod_defaults')
-
-# Create the table
-cursor.execute('''
-CREATE TABLE prod_defaults (
-    def_id INT,
-    def_name TEXT,
-    def_descr TEXT,
-    def_domain TEXT
-)
-''')
-
-# Process the DataFrame and insert data into the database
-for index, row in df.iterrows():
-    cursor.execute('''
-        INSERT INTO prod_defaults (def_id, def_name, def_descr, def_domain)
-        VALUES (?, ?, ?, ?)
-    ''', (row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3]
-        ))
-
-# Commit the transaction and close the connection
-conn.commit()
-conn.close()
-
-# Load the CSV data
-df = pd.read_csv('csv/pp_tracking.csv', sep=';')
-
-# Define the SQLite database
-conn = sqlite3.connect('database1.db')
-cursor = conn.cursor()
-
-# Drop the table if it already exists
-cursor.execute('DROP TABLE IF EXISTS pp_tracking')
-
-# Create the table
-cursor.execute('''
-CREATE TABLE pp_tracking (
-    ofa TEXT,
-    dte TEXT,
-    uusr TEXT,
-    usr TEXT,
-    shift INTEGER,
-    ope TEXT,
-    qty_ok INTEGER,
-    qty_ko INTEGER,
-    defaults TEXT,
-    comments TEXT
-)
-''')
-
-# Process the DataFrame and insert data into the database
-for index, row in df.iterrows():
-    cursor.execute('''
-        INSERT INTO pp_tracking (ofa, dte, uusr, usr, shift, ope, qty_ok, qty_ko, defaults, comments)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3], row.iloc[4], row.iloc[5], 
-          row.iloc[6], row.iloc[7], row.iloc[8], row.iloc[9]
+from db import database_path
+from rollups import ROLLUP_SOURCES, rollups_built, track_changes, stop_tracking, refresh_after_ingest
+from ofa_index import OFA_INDEX_SOURCE, ofa_index_built, refresh_ofa_index
+from reconciliation import RECONCILIATION_SOURCES, reconciliation_built, refresh_reconciliation
+
+CHUNK_SIZE = 10_000 # Number of CSV rows read and written at once
+
+# For each table : database, CSV extract, columns (in CSV order) with their type,
+# natural key (None when the extract is a full snapshot, replaced at each run) and secondary indexes.
+TABLES = {
+    'ofas': {
+        'db': database_path('database2.db'),
+        'csv': 'csv/OFAs.csv',
+        'columns': [
+            ('LOT_REFCOMPL', 'TEXT'),
+            ('LOT_RELEASED_QTY', 'INTEGER'),
+            ('LOT_REJECT_RELEASED_QTY', 'INTEGER'),
+            ('FAC_REFERENCE', 'TEXT'),
+            ('SCS_STEP_NUMBER', 'INTEGER'),
+            ('TAS_REF', 'TEXT'),
+            ('SCS_SHORT_DESCR', 'TEXT'),
+            ('TAL_RELEASE_QTY', 'INTEGER'),
+            ('TAL_REJECTED_QTY', 'INTEGER'),
+            ('TAL_BEGIN_REAL_DATE', 'TEXT'),
+            ('TAL_END_REAL_DATE', 'TEXT'),
+        ],
+        'key': None, # The ERP extract repeats identical step rows, which rename_ops relies on
+        'indexes': [],
+    },
+    'prod_defaults': {
+        'db': database_path('database1.db'),
+        'csv': 'csv/defaults.csv',
+        'columns': [
+            ('def_id', 'INT'),
+            ('def_name', 'TEXT'),
+            ('def_descr', 'TEXT'),
+            ('def_domain', 'TEXT'),
+        ],
+        'key': ['def_id'],
+        'indexes': [],
+    },
+    'pp_tracking': {
+        'db': database_path('database1.db'),
+        'csv': 'csv/pp_tracking.csv',
+        'columns': [
+            ('ofa', 'TEXT'),
+            ('dte', 'TEXT'),
+            ('uusr', 'TEXT'),
+            ('usr', 'TEXT'),
+            ('shift', 'INTEGER'),
+            ('ope', 'TEXT'),
+            ('qty_ok', 'INTEGER'),
+            ('qty_ko', 'INTEGER'),
+            ('defaults', 'TEXT'),
+            ('comments', 'TEXT'),
+        ],
+        'key': ['ofa', 'dte', 'uusr', 'usr', 'shift', 'ope'],
+        'indexes': [['dte', 'shift'], ['ofa']], # See filters.apply_filter_query, (dte, shift) also serves dte-only searches
+    },
+    'uu_tracking': {
+        'db': database_path('database1.db'),
+        'csv': 'csv/smc_tracking.csv',
+        'columns': [
+            ('id', 'INTEGER'),
+            ('usr', 'TEXT'),
+            ('dte', 'TEXT'),
+            ('shift', 'INTEGER'),
+            ('pdc', 'TEXT'),
+            ('qty_ok', 'INTEGER'),
+            ('qty_ko', 'INTEGER'),
+            ('d0', 'INTEGER'),
+            ('d1', 'INTEGER'),
+            ('d2', 'INTEGER'),
+            ('d3', 'INTEGER'),
+            ('d4', 'INTEGER'),
+            ('d5', 'INTEGER'),
+            ('d6', 'INTEGER'),
+            ('comments', 'TEXT'),
+            ('ofa', 'TEXT'),
+            ('week', 'TEXT'),
+            ('defaults', 'TEXT'),
+        ],
+        'key': ['id'],
+        'indexes': [['dte', 'shift'], ['ofa'], ['usr', 'pdc']], # (usr, pdc) covers utils.load_label_catalog
+    },
+}
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL') # Readers are not blocked by the ingestion transaction
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+def key_expressions(key):
+    # NULL never conflicts in a unique index, so compare NULL key values as ''.
+    return ', '.join(f"IFNULL({column}, '')" for column in key)
+
+def create_table(cursor, table, spec, rebuild):
+    if rebuild:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    columns = ',\n    '.join(f'{name} {type_}' for name, type_ in spec['columns'])
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (\n    {columns}\n)')
+    if spec['key']:
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_key ON {table} ({key_expressions(spec["key"])})')
+
+def create_indexes(cursor, table, spec):
+    for columns in spec['indexes']:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{"_".join(columns)} ON {table} ({", ".join(columns)})')
+
+def upsert_query(table, spec):
+    names = [name for name, _ in spec['columns']]
+    query = f'INSERT INTO {table} ({", ".join(names)}) VALUES ({", ".join("?" for _ in names)})'
+    if spec['key']:
+        others = [name for name in names if name not in spec['key']]
+        # Only rewrite the rows whose values changed.
+        query += (
+            f' ON CONFLICT({key_expressions(spec["key"])}) DO UPDATE SET ({", ".join(others)}) = ({", ".join("excluded." + name for name in others)})'
+            f' WHERE ({", ".join(others)}) IS NOT ({", ".join("excluded." + name for name in others)})'
         )
-    )
-
-# Commit the transaction and close the connection
-conn.commit()
-conn.close()
-
-# Load the CSV data
-df = pd.read_csv('csv/smc_tracking.csv', sep=';') # id; usr; dte; shift; pdc; qty_ok; qty_ko; d0; d1; d2; d3; d4; d5; d6; comments; ofa; week; defaults
-
-# Define the SQLite database
-conn = sqlite3.connect('database1.db')
-cursor = conn.cursor()
-
-# Drop the table if it already exists
-cursor.execute('DROP TABLE IF EXISTS uu_tracking')
-
-# Create the table
-cursor.execute('''
-CREATE TABLE uu_tracking (
-    id INTEGER,
-    usr TEXT,
-    dte TEXT,
-    shift INTEGER,
-    pdc TEXT,
-    qty_ok INTEGER,
-    qty_ko INTEGER,
-    d0 INTEGER,
-    d1 INTEGER,
-    d2 INTEGER,
-    d3 INTEGER,
-    d4 INTEGER,
-    d5 INTEGER,
-    d6 INTEGER,
-    comments TEXT,
-    ofa TEXT,
-    week TEXT,
-    defaults TEXT
-)
-''')
-
-# Process the DataFrame and insert data into the database
-for index, row in df.iterrows():
-    cursor.execute('''
-        INSERT INTO uu_tracking (id, usr, dte, shift, pdc, qty_ok, qty_ko, d0, d1, d2, d3, d4, d5, d6, comments, ofa, week, defaults)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3], row.iloc[4], row.iloc[5], 
-          row.iloc[6], row.iloc[7], row.iloc[8], row.iloc[9], row.iloc[10], row.iloc[11], 
-          row.iloc[12], row.iloc[13], row.iloc[14], row.iloc[15], row.iloc[16], row.iloc[17]
-        )
-    )
-
-# Commit the transaction and close the connection
-conn.commit()
-conn.close()
\ No newline at end of file
+    return query
+
+def read_chunks(spec):
+    names = [name for name, _ in spec['columns']]
+    # The extracts have no header line.
+    for chunk in pd.read_csv(spec['csv'], sep=';', header=None, names=names, usecols=range(len(names)), chunksize=CHUNK_SIZE):
+        yield chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None) # Python values, NULL for NaN
+
+def ingest_table(conn, table, spec, rebuild=False):
+    """
+    Args:
+        conn (sqlite3.Connection): connection to the database of the table
+        table (str): table name
+        spec (dict): table description from TABLES
+        rebuild (bool): drop and recreate the table first
+    Returns:
+        rows_written (int): number of rows inserted or updated (for a table without key, cleared first, the rows inserted)
+        rollup_rows_written (int): number of weekly rollup rows rewritten
+    """
+    cursor = conn.cursor()
+    with conn: # One transaction for the whole table, and its rollups
+        create_table(cursor, table, spec, rebuild)
+        incremental = table in ROLLUP_SOURCES and not rebuild and rollups_built(cursor, table)
+        index_incremental = table == OFA_INDEX_SOURCE and not rebuild and ofa_index_built(cursor)
+        reconciliation_incremental = table in RECONCILIATION_SOURCES and not rebuild and reconciliation_built(cursor, table)
+        tracked = incremental or index_incremental or reconciliation_incremental
+        if tracked:
+            track_changes(cursor, table) # Temporary triggers, the weeks and ofas to refresh are those of the written rows
+        if not spec['key']:
+            cursor.execute(f'DELETE FROM {table}')
+        query = upsert_query(table, spec)
+        rows_written = 0
+        for rows in read_chunks(spec):
+            cursor.executemany(query, rows)
+            rows_written += cursor.rowcount # The rows of this statement only, not those of the DELETE or of the triggers
+        create_indexes(cursor, table, spec) # After the load, so that a fresh table is indexed in one pass
+        if table == OFA_INDEX_SOURCE:
+            refresh_ofa_index(conn, index_incremental) # Before the rollups, the pp_tracking Equipment is read from it
+        if table in RECONCILIATION_SOURCES:
+            refresh_reconciliation(conn, table, reconciliation_incremental) # Declared NOK against its breakdowns, see reconciliation.py
+        rollup_rows_written = refresh_after_ingest(conn, table, incremental) if table in ROLLUP_SOURCES else 0
+        if tracked and not incremental:
+            stop_tracking(cursor, table)
+    return rows_written, rollup_rows_written
+
+def main(tables, rebuild=False):
+    for table in tables:
+        spec = TABLES[table]
+        start = time.perf_counter()
+        conn = connect(spec['db'])
+        rows_written, rollup_rows_written = ingest_table(conn, table, spec, rebuild)
+        conn.close()
+        print(f'{table}: {rows_written} rows written ({rollup_rows_written} rollup rows) in {time.perf_counter() - start:.2f}s')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest the CSV extracts into database1.db and database2.db.')
+    parser.add_argument('tables', nargs='*', help=f'Tables to ingest among {", ".join(TABLES)} (all by default).')
+    parser.add_argument('--rebuild', action='store_true', help='Drop and recreate the tables before ingesting.')
+    args = parser.parse_args()
+    for table in args.tables:
+        if table not in TABLES:
+            parser.error(f'unknown table {table}')
+    main(args.tables or list(TABLES), args.rebuild)
@@ -0,0 +1,126 @@
+"""
+Module related to the connections of the dashboard to the SQLite databases.
+
+The loaders do not open a connection per query : each thread keeps one read-only connection per database,
+so that the schema is parsed once and the page cache (and the memory map) stays warm between callbacks.
+The databases are looked up in DASHBOARD_DATA_DIR (the repository by default), database1.db and database2.db
+can also be moved separately with DASHBOARD_DATABASE1 and DASHBOARD_DATABASE2.
+"""
+
+import os, time, sqlite3, threading
+
+from metrics import record_sql
+
+DATA_DIR = os.path.abspath(os.environ.get('DASHBOARD_DATA_DIR', os.path.dirname(os.path.abspath(__file__))))
+
+DATABASE_PATHS = {
+    'database1.db': os.path.abspath(os.environ.get('DASHBOARD_DATABASE1', os.path.join(DATA_DIR, 'database1.db'))),
+    'database2.db': os.path.abspath(os.environ.get('DASHBOARD_DATABASE2', os.path.join(DATA_DIR, 'database2.db'))),
+}
+
+MMAP_SIZE = 256 * 1024 * 1024 # Bytes of the database file read through the memory map
+CACHE_SIZE = -64 * 1024 # Page cache of each connection, in KiB when negative
+STATEMENT_CACHE_SIZE = 256 # Prepared statements kept by each connection
+
+_local = threading.local()
+_inherited = [] # Connections of the parent process, see forget_connections
+
+def forget_connections():
+    # A forked process (background callback job, gunicorn worker) must not use the connections of its parent.
+    # They are kept aside, never used nor closed, and new ones are opened on first use.
+    global _local
+    _inherited.append(_local)
+    _local = threading.local()
+
+os.register_at_fork(after_in_child=forget_connections)
+
+def database_path(db_name):
+    """
+    Args:
+        db_name (str): 'database1.db', 'database2.db' or the path of another database
+    Returns:
+        path (str): absolute path of the database file
+    """
+    return DATABASE_PATHS.get(db_name) or os.path.abspath(db_name)
+
+def set_data_dir(data_dir):
+    """
+    Args:
+        data_dir (str): folder holding database1.db and database2.db, e.g. a synthetic dataset (see benchmarks/synthetic.py)
+    The loaders and their caches use the new databases from their next call.
+    """
+    for db_name in DATABASE_PATHS:
+        DATABASE_PATHS[db_name] = os.path.abspath(os.path.join(data_dir, db_name))
+
+def file_identity(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor reporting the time spent in SQLite and the rows fetched to the callback being run (see metrics.py).
+    """
+    def execute(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            record_sql(time.perf_counter() - start, 0)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        record_sql(time.perf_counter() - start, int(row is not None))
+        return row
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args)
+        record_sql(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        record_sql(time.perf_counter() - start, len(rows))
+        return rows
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+def open_read_only(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, cached_statements=STATEMENT_CACHE_SIZE, factory=TimedConnection)
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size={CACHE_SIZE}')
+    conn.execute('PRAGMA query_only=1')
+    return conn
+
+def get_connection(db_name):
+    """
+    Args:
+        db_name (str): database, see database_path
+    Returns:
+        conn (sqlite3.Connection): read-only connection of the current thread, not to be closed by the caller.
+                                   It is reopened when the file is replaced (not when it is written to,
+                                   every query already reads the last committed state).
+    """
+    path = database_path(db_name)
+    connections = _local.__dict__.setdefault('connections', {})
+    identity = file_identity(path)
+    if path in connections:
+        conn, conn_identity = connections[path]
+        if conn_identity == identity:
+            return conn
+        conn.close()
+    conn = open_read_only(path)
+    connections[path] = (conn, identity)
+    return conn
+
+def table_exists(cursor, table):
+    return cursor.execute("select 1 from sqlite_master where type = 'table' and name = ?", (table,)).fetchone() is not None
+
+def close_connections():
+    # Connections of the current thread only, the other threads close theirs when they exit.
+    for conn, _ in _local.__dict__.pop('connections', {}).values():
+        conn.close()
@@ -0,0 +1,146 @@
+"""
+Module related to the defaults JSON column (NOK quantity of each defect Type) of uu_tracking and pp_tracking.
+"""
+
+import ast, json, hashlib, threading
+
+import pandas as pd, numpy as np
+
+from functools import lru_cache
+
+from cache import database_version
+from db import get_connection
+
+def string_to_hex_color(s):
+    # Convert the string to a hash
+    hash_object = hashlib.md5(s.encode())
+    # Get the hexadecimal representation of the hash
+    hex_dig = hash_object.hexdigest()
+    # Take the first 6 characters to form a hex color code
+    hex_color = '#' + hex_dig[:6]
+    return hex_color
+
+class DefaultsCatalog:
+    """
+    Process-wide view of prod_defaults : description and domain of each defect name, color of each description.
+    The dictionaries are shared, callers must not modify them.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._version = None
+        self._rows = None
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._domains = {}
+        self._colors = {}
+        self.reloads = 0
+
+    def refresh(self):
+        # A stat of the database file per call, prod_defaults is only read again when the file changed,
+        # and the dictionaries only rebuilt when prod_defaults itself changed.
+        version = database_version(self.db_path)
+        with self._lock:
+            if version == self._version:
+                return
+            rows = get_connection(self.db_path).execute('select def_name, def_descr, def_domain from prod_defaults').fetchall()
+            if rows != self._rows:
+                self._descriptions = {name: descr for name, descr, _ in rows}
+                self._domains = {name: domain for name, _, domain in rows}
+                self._colors = {descr: string_to_hex_color(descr) for _, descr, _ in rows if isinstance(descr, str)}
+                self._rows = rows
+                self.reloads += 1
+            self._version = version
+
+    def descriptions(self):
+        """
+        Returns:
+            descriptions (dict): defect name (e.g. 'd9') to description
+        """
+        self.refresh()
+        return self._descriptions
+
+    def colors(self):
+        """
+        Returns:
+            colors (dict): description to hex color
+        """
+        self.refresh()
+        return self._colors
+
+    def domains(self):
+        """
+        Returns:
+            domains (dict): defect name to domain
+        """
+        self.refresh()
+        return self._domains
+
+DEFAULTS_CATALOG = DefaultsCatalog('database1.db')
+
+@lru_cache(maxsize=4096)
+def parse_defaults(defaults):
+    """
+    Args:
+        defaults (str): raw defaults JSON string, e.g. '{"d9":1,"d11":2}'
+    Returns:
+        items (tuple): (defect name, NOK quantity) pairs, memoized since most rows share a handful of patterns
+    """
+    if not defaults.strip():
+        return ()
+    try:
+        nok_dict = json.loads(defaults)
+    except json.JSONDecodeError:
+        try:
+            nok_dict = ast.literal_eval(defaults)
+        except (SyntaxError, ValueError) as e:
+            print(f"Error for defaults: {defaults} - {e}")
+            return ()
+    if not isinstance(nok_dict, dict):
+        return ()
+    return tuple(nok_dict.items())
+
+def explode_defaults(defaults, mapping=None):
+    """
+    Args:
+        defaults (pd.Series): raw defaults JSON column
+        mapping (dict): defect name to description (see DefaultsCatalog.descriptions), names not found are kept
+    Returns:
+        df_long (pd.DataFrame): one line per (row, Type) with columns 'row_id' (position of the row in defaults),
+                                'Type' and 'NOK by Type'
+    """
+    mapping = mapping or {}
+    codes, uniques = pd.factorize(defaults) # Missing values get code -1
+
+    # Parse and rename each distinct pattern once.
+    patterns = [{mapping.get(k, k): v for k, v in (parse_defaults(value) if isinstance(value, str) else ())} for value in uniques]
+    lengths = np.array([len(pattern) for pattern in patterns] + [0], dtype=np.int64) # Last slot for missing values (code -1)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    pattern_types = np.array([k for pattern in patterns for k in pattern], dtype=object)
+    pattern_qtys = np.array([v for pattern in patterns for v in pattern.values()])
+
+    # Repeat every row as many times as its pattern has Types, then pick the matching pattern entries.
+    row_lengths = lengths[codes]
+    row_id = np.repeat(np.arange(len(codes)), row_lengths)
+    first_entry = np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    entry = np.repeat(offsets[codes], row_lengths) + np.arange(len(row_id)) - first_entry
+
+    return pd.DataFrame({
+        'row_id': row_id,
+        'Type': pattern_types[entry] if len(entry) else np.array([], dtype=object),
+        'NOK by Type': pattern_qtys[entry] if len(entry) else np.array([], dtype=np.int64),
+    })
+
+def explode_type(df, columns, mapping=None):
+    """
+    Args:
+        df (pd.DataFrame): loaded dataframe with a raw defaults 'Type' column
+        columns (list): columns of df to carry over (and group on)
+        mapping (dict): defect name to description
+    Returns:
+        df_Type (pd.DataFrame): 'NOK by Type', 'OK' and 'NOK' summed by Type and columns
+    """
+    df_long = explode_defaults(df['Type'], mapping)
+    df_Type = df[columns + ['OK', 'NOK']].take(df_long['row_id'].values).reset_index(drop=True)
+    df_Type.insert(0, 'Type', df_long['Type'].values)
+    df_Type.insert(1, 'NOK by Type', df_long['NOK by Type'].values)
+    return df_Type.groupby(['Type'] + columns, as_index=False, observed=True).sum()
@@ -1,73 +1,102 @@
-import sqlite3
+import datetime
 
-import pandas as pd
+import pandas as pd, numpy as np
 
 from pathlib import Path
 
 from dicts import OPERATION_DICT_RP
+from cache import DataFrameCache, cached_loader
+from db import get_connection
 
 ofaS_PATH = Path("C:/Users/a22006/Desktop/Dashboard_hmsa/csv/ofas.csv") # Path("/Users/leondeligny/Desktop/Master/Dashboard_hmsa/ofas.csv")
 
 ofaS_COLS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
 ofaS_NAME = ["LOT_REFCOMPL", "LOT_RELEASED_QTY", "LOT_REJECT_RELEASED_QTY", "FAC_REFERENCE", "KEY", "SCS_STEP_NUMBER", "TAS_REF", "SCS_SHORT_DESCR", "TAL_RELEASE_QTY", "TAL_REJECTED_QTY", "TAL_BEGIN_REAL_DATE", "TAL_END_REAL_DATE"]
 
-def rename_ops(group):
-        ctrl_counter = 0
-        lav_counter = 0
-        new_descriptions = []
-        for op in group['Operation']:
-            if op == 'Operation 120':
-                if ctrl_counter == 0:
-                    new_descriptions.append('CCLACCLA')
-                elif ctrl_counter == 1:
-                    new_descriptions.append('100')
-                else: # Handles all cases after the first and second
-                    new_descriptions.append('50')
-                ctrl_counter += 1
-            elif op == 'Operation 70':
-                if lav_counter == 0:
-                    new_descriptions.append('LFLFLF')
-                else:
-                    new_descriptions.append('LTLTLT')
-                lav_counter += 1
-            else:
-                new_descriptions.append(op) # doesn't change the non 'Operation 120'
-        group['Operation'] = new_descriptions
-        return group
-
-def df_erp_load():
-    # Connect to the PostgreSQL database
-    conn = sqlite3.connect('database2.db')
+def rename_ops(df):
+    """
+    Args:
+        df (pd.DataFrame): ERP steps, in their original order within each ofa
+    Returns:
+        operation (np.ndarray): operations where the repeated 'Operation 120' of an ofa become 'CCLACCLA', '100' then '50',
+                                and the repeated 'Operation 70' become 'LFLFLF' then 'LTLTLT'
+    """
+    occurrence = df.groupby(['ofa', 'Operation'], observed=True).cumcount()
+    return np.select(
+        [
+            (df['Operation'] == 'Operation 120') & (occurrence == 0),
+            (df['Operation'] == 'Operation 120') & (occurrence == 1),
+            (df['Operation'] == 'Operation 120'),
+            (df['Operation'] == 'Operation 70') & (occurrence == 0),
+            (df['Operation'] == 'Operation 70'),
+        ],
+        ['CCLACCLA', '100', '50', 'LFLFLF', 'LTLTLT'],
+        default=df['Operation'],
+    )
+
+def validation_ofa(ofa):
+    """
+    Args:
+        ofa (pd.Series): ofa names
+    Returns:
+        validation (pd.Series): 1 for the -1/-2/-3 ofas of a family that has a -2 or a -3 ofa, 0 otherwise
+    """
+    base_name, suffix = ofa.str[:-2], ofa.str[-2:]
+    validated_families = base_name[suffix.isin(['-2', '-3'])].unique()
+    return (suffix.isin(['-1', '-2', '-3']) & base_name.isin(validated_families)).astype(int)
+
+def erp_date_bounds(input_values):
+    """
+    Args:
+        input_values (dict): filter values with 'Year' and 'Week' (start_week, end_week)
+    Returns:
+        start, end (str): ISO dates such that start <= Begin Date < end holds for every step of the selected
+                          weeks (ERP weeks run from Sunday to Saturday, see the 'Week' column of df_erp_load)
+    """
+    year = int(input_values['Year'])
+    start_week, end_week = input_values['Week']
+    start, end = datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+    # Weeks 1, 52 and 53 straddle the new year (e.g. the last days of December in week 1), keep the whole year for them.
+    if start_week > 1 and end_week < 52:
+        start = datetime.date.fromisocalendar(year, start_week, 1) - datetime.timedelta(days=1)
+        end = datetime.date.fromisocalendar(year, end_week, 7)
+    return start.isoformat(), end.isoformat()
+
+ERP_CACHE = DataFrameCache('df_erp_load', 'database2.db')
+
+@cached_loader(ERP_CACHE)
+def df_erp_load(input_values):
+    # Read-only connection of this thread, kept open between calls (see db.py)
+    conn = get_connection('database2.db')
+    # Keep every step of the ofa families (same name but the last 2 characters) having a step in the selected weeks,
+    # since the renaming, the validation flag and the dropped ofas depend on all of them.
     query = """
         select LOT_REFCOMPL as ofa, LOT_RELEASED_QTY, LOT_REJECT_RELEASED_QTY, FAC_REFERENCE, SCS_STEP_NUMBER, TAS_REF, SCS_SHORT_DESCR, TAL_RELEASE_QTY, TAL_REJECTED_QTY, TAL_BEGIN_REAL_DATE, TAL_END_REAL_DATE
         from ofas 
+        where substr(LOT_REFCOMPL, 1, length(LOT_REFCOMPL) - 2) in (
+            select substr(LOT_REFCOMPL, 1, length(LOT_REFCOMPL) - 2)
+            from ofas
+            where TAL_BEGIN_REAL_DATE >= ? and TAL_BEGIN_REAL_DATE < ?
+        )
     """
 
     # Execute the query and load data into a DataFrame
-    df_ofa_RP = pd.read_sql_query(query, conn) #df_ofa_RP = pd.read_csv(ofaS_PATH, delimiter=';', usecols=ofaS_COLS, names=ofaS_NAME, skiprows=1)
+    df_ofa_RP = pd.read_sql_query(query, conn, params=erp_date_bounds(input_values)) #df_ofa_RP = pd.read_csv(ofaS_PATH, delimiter=';', usecols=ofaS_COLS, names=ofaS_NAME, skiprows=1)
     
     df_ofa_RP = df_ofa_RP.drop(['LOT_RELEASED_QTY', 'LOT_REJECT_RELEASED_QTY'], axis=1)
     df_ofa_RP = df_ofa_RP.rename(columns={'SCS_STEP_NUMBER': 'Operation Step', 'SCS_SHORT_DESCR': 'Operation', 'LOT_REFCOMPL': 'ofa', 'FAC_REFERENCE': 'Equipment', 'TAL_BEGIN_REAL_DATE': 'Begin Date', 'TAL_END_REAL_DATE': 'End Date', 'TAL_RELEASE_QTY': 'OK', 'TAL_REJECTED_QTY': 'NOK'})
+    df_ofa_RP = df_ofa_RP[df_ofa_RP['ofa'].notna()]
     temp_df = df_ofa_RP[df_ofa_RP['Operation Step'] == 10]
     ofa_with_10 = temp_df['ofa'].unique()
 
-    df_ofa_RP = df_ofa_RP.groupby('ofa').apply(rename_ops)
-    df_ofa_RP = df_ofa_RP.drop('ofa', axis=1)
-    df_ofa_RP = df_ofa_RP.reset_index()
-    df_ofa_RP = df_ofa_RP.drop('level_1', axis=1)
+    df_ofa_RP['Operation'] = rename_ops(df_ofa_RP)
     df_ofa_RP = df_ofa_RP.sort_values(by=['ofa', 'Operation Step'], ascending=[False, False])
     df_ofa_RP['Operation'] = df_ofa_RP['Operation'].map(OPERATION_DICT_RP).fillna(df_ofa_RP['Operation'])
 
     cv_df = df_ofa_RP[df_ofa_RP['Operation'] == '50']
     ofa_with_cv = cv_df['ofa'].unique()
 
-    df_ofa_RP['Validation ofa'] = False
-    grouped = df_ofa_RP.groupby('ofa')
-    for name, _ in grouped:
-        base_name = name[:-2]
-        if name.endswith('-2') or name.endswith('-3'):
-            df_ofa_RP.loc[(df_ofa_RP['ofa'] == base_name + '-1') | (df_ofa_RP['ofa'] == base_name + '-2') | (df_ofa_RP['ofa'] == base_name + '-3'), 'Validation ofa'] = True
-    df_ofa_RP['Validation ofa'] = df_ofa_RP['Validation ofa'].astype(int) # (df_ofa_RP['Validation ofa'] == 1) |
+    df_ofa_RP['Validation ofa'] = validation_ofa(df_ofa_RP['ofa'])
 
     ofa_to_drop = df_ofa_RP.loc[~df_ofa_RP['ofa'].isin(ofa_with_cv) | ~df_ofa_RP['ofa'].isin(ofa_with_10) | df_ofa_RP['Begin Date'].isna() | df_ofa_RP['End Date'].isna() | ((df_ofa_RP['Operation Step'] == 10) & (df_ofa_RP['Operation'] != 'Ten')) , 'ofa'].unique()
     df_ofa_RP = df_ofa_RP.loc[~df_ofa_RP['ofa'].isin(ofa_to_drop)]
@@ -76,4 +105,4 @@ def df_erp_load():
     df_ofa_RP['Week'] = df_ofa_RP['Begin Date'].dt.to_period('W-SAT').dt.week
     df_ofa_RP['Year'] = (df_ofa_RP['Begin Date'].dt.year).astype(int)
 
-    return df_ofa_RP
\ No newline at end of file
+    return df_ofa_RP
@@ -0,0 +1,70 @@
+"""
+Module related to the feature extraction of the loaded data.
+
+Every feature is computed on whole columns (no row-wise apply), the results match
+utils.assign_team, utils.assign_weekday and the former np.where/to_period week computation of pp_load.
+"""
+
+import calendar
+
+import pandas as pd, numpy as np
+
+SPECIAL_TEAM_OPERATORS = ['WWW', 'DRD', 'ESI'] # Operators always assigned to team 3
+
+WEEKDAY_NAMES = dict(enumerate(calendar.day_name))
+
+def is_night(shift):
+    # Shift may still be the integer code or already mapped with SHIFT_DICT.
+    return shift.isin([2, 'Night'])
+
+def compute_team(df):
+    """
+    Args:
+        df (pd.DataFrame): dataframe with 'Operator', integer 'Week' and integer 'Shift' columns
+    Returns:
+        team (pd.Series): team of each row
+    """
+    team = np.where(df['Operator'].isin(SPECIAL_TEAM_OPERATORS), 3, (df['Week'] + df['Shift']) % 3)
+    return pd.Series(team, index=df.index)
+
+def compute_weekday(df):
+    """
+    Args:
+        df (pd.DataFrame): dataframe with datetime 'Date' and 'Shift' columns
+    Returns:
+        weekday (pd.Series): name of the day of the week, a night shift counting for the following day
+    """
+    dayofweek = (df['Date'].dt.dayofweek + is_night(df['Shift'])) % 7
+    return dayofweek.map(WEEKDAY_NAMES)
+
+def compute_year(df):
+    return df['Date'].dt.year.astype(int)
+
+def compute_production_week(df):
+    """
+    Args:
+        df (pd.DataFrame): dataframe with datetime 'Date' and integer 'Shift' columns
+    Returns:
+        week (pd.Series): production week (weeks run from Sunday to Saturday, except that
+                          Sunday's day shifts still belong to the week that ends on the Saturday before)
+    """
+    # The Sunday-to-Saturday week of a day is the ISO week of the next day.
+    sunday_day_shift = (df['Date'].dt.dayofweek == 6) & (df['Shift'] != 2)
+    offset = pd.to_timedelta(1 - sunday_day_shift.astype(int), unit='D')
+    return (df['Date'] + offset).dt.isocalendar().week.astype(int)
+
+def compact_dtypes(df, category_columns, integer_columns):
+    """
+    Args:
+        df (pd.DataFrame): loaded dataframe, converted in place
+        category_columns (list): low-cardinality text columns (names, shifts, operations...), stored as category
+        integer_columns (list): quantities and calendar numbers, stored as int32 (columns with missing values are left as they are)
+    Returns:
+        df (pd.DataFrame): same dataframe
+    """
+    for column in category_columns:
+        df[column] = df[column].astype('category')
+    for column in integer_columns:
+        if pd.api.types.is_integer_dtype(df[column]):
+            df[column] = df[column].astype('int32')
+    return df
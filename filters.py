@@ -3,9 +3,10 @@ Module related to filtering dataframes.
 """
 
 import pandas as pd
-import calendar
+import calendar, datetime, re
 
-from dicts import EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENT_TYPES
+from dicts import EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENT_TYPES, INV_SHIFT_DICT
+from metrics import record_filtered
 
 def filter_operator(df, operator_value):
     if operator_value != 'All':
@@ -84,34 +85,98 @@ def filter_dataframe(data_frame, input_values):
     if 'Operator' in input_values:
         data_frame = filter_by_column(data_frame, 'Operator', input_values['Operator'])
     
-    if 'Weekday' in input_values and input_values['Weekday']:
+    # The weekly rollups have no Date, they are only used when these two filters are left to their default (see rollups.covers_filters).
+    daily = 'Date' in data_frame.columns
+
+    if 'Weekday' in input_values and input_values['Weekday'] and daily:
         data_frame = data_frame[data_frame['Weekday'].isin(input_values['Weekday'])]
 
     if 'Equipment' in input_values and input_values['Equipment'] != 'All':
         equipment = input_values['Equipment']
         data_frame = data_frame[data_frame['Equipment'] == equipment]
 
-    if 'Equipments per Operator' in input_values:
+    if 'Equipments per Operator' in input_values and daily:
         if '#Equipments/Operator' not in data_frame.columns:
             data_frame = data_frame.sort_values(by=['Date', 'Shift'], ascending=[False, False])
-            df_equipment_per_operator = data_frame.groupby(['Date', 'Shift', 'Operator'])['Equipment'].nunique().reset_index(name='#Equipments/Operator')
+            df_equipment_per_operator = data_frame.groupby(['Date', 'Shift', 'Operator'], observed=True)['Equipment'].nunique().reset_index(name='#Equipments/Operator')
             data_frame = pd.merge(data_frame, df_equipment_per_operator, on=['Date', 'Shift', 'Operator'])
         data_frame = data_frame[data_frame['#Equipments/Operator'].isin(input_values['Equipments per Operator'])]
 
+    record_filtered(len(data_frame))
     return data_frame
 
-def apply_filter_query(query, input_values):
+def week_start(year, week):
+    """
+    Args:
+        year (int): year
+        week (int): week number as given by strftime('%W') (weeks start on Monday, week 0 holds the days before the first Monday)
+    Returns:
+        date (datetime.date): first day of the week, clipped to the 1st of January of the next year
+    """
+    first_day = datetime.date(year, 1, 1)
+    if week <= 0:
+        return first_day
+    first_monday = first_day + datetime.timedelta(days=(7 - first_day.weekday()) % 7)
+    return min(first_monday + datetime.timedelta(weeks=week - 1), datetime.date(year + 1, 1, 1))
+
+def date_bounds(input_values):
+    """
+    Args:
+        input_values (dict): filter values with 'Year' and 'Week' (start_week, end_week)
+    Returns:
+        start, end (str): ISO dates such that start <= dte < end selects exactly the weeks of the year
+    """
+    year = int(input_values['Year'])
     start_week, end_week = input_values['Week']
-
+    return week_start(year, start_week).isoformat(), week_start(year, end_week + 1).isoformat()
+
+def apply_filter_query(query, input_values, operations=None):
+    """
+    Args:
+        query (str): select ... from ... statement without WHERE clause
+        input_values (dict): filter values (Year, Week and Shift are applied here)
+        operations (iterable): operations to keep (pp_tracking only)
+    Returns:
+        filtered_query (str): query with bound parameters, so that SQLite can use the dte indexes and reuse the statement
+        params (list): values of the parameters
+    """
     # Start to filter on Year and Week (Two features that are ALWAYS present in every db).
-    filtered_query = query + (  
-        f"WHERE CAST(strftime('%Y', dte) AS INTEGER) = {input_values['Year']} "
-        f"AND CAST(strftime('%W', dte) AS INTEGER) BETWEEN {start_week} AND {end_week}"
-    )
+    filtered_query = query + "WHERE dte >= ? AND dte < ?"
+    params = list(date_bounds(input_values))
 
     if 'Shift' in input_values and input_values['Shift'] != 'All':
-        filtered_query += f"AND shift = '{input_values['Shift']}'"
+        filtered_query += " AND shift = ?"
+        params.append(INV_SHIFT_DICT.get(input_values['Shift'], input_values['Shift'])) # shift is stored as an integer
+
+    # Only keep the requested operations (pp_tracking only).
+    if operations:
+        filtered_query += " AND ope IN ({})".format(', '.join('?' for _ in operations))
+        params.extend(operations)
 
     filtered_query += ";"
 
-    return filtered_query
\ No newline at end of file
+    return filtered_query, params
+
+TABLE_FILTER_OPERATORS = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+TABLE_FILTER_PART = re.compile(r'^\{(?P<column>[^}]+)\}\s+(?P<case>[si]?)(?P<operator>contains|datestartswith|eq|ne|lt|le|gt|ge|>=|<=|!=|=|<|>)\s+(?P<value>.*)$')
+
+def split_filter_query(filter_query):
+    """
+    Args:
+        filter_query (str): filter_query of a DataTable run with filter_action='custom',
+                            e.g. '{ofa} contains "333" && {Last Update} >= 01-06-2024'
+    Returns:
+        conditions (list): (column, operator, value, case_insensitive) of each part, operator being 'contains',
+                           'datestartswith' or an SQL comparison operator, the parts that cannot be read are left out
+    """
+    conditions = []
+    for part in (filter_query or '').split(' && '):
+        match = TABLE_FILTER_PART.match(part.strip())
+        if match is None:
+            continue
+        value = match['value'].strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        operator = TABLE_FILTER_OPERATORS.get(match['operator'], match['operator'])
+        conditions.append((match['column'], operator, value, match['case'] == 'i'))
+    return conditions
@@ -1,10 +1,76 @@
-import plotly.graph_objects as go, pandas as pd
+import os
+
+import plotly.graph_objects as go, pandas as pd, numpy as np
 
 from smc_load import load_color_dict_operator
 
 from dicts import SHIFT_COLOR_DICT, COLOR_DICT_EQUIPMENT
 
-from utils import returns_defaults_color_dict
+from defaults import DEFAULTS_CATALOG
+
+###############
+# Large plots #
+###############
+
+# A full year with every operator or defect type can reach thousands of points, each one an SVG element in the browser.
+WEBGL_THRESHOLD = int(os.environ.get('DASHBOARD_WEBGL_THRESHOLD', 1000)) # Points of a line above which it is drawn with WebGL (Scattergl)
+MAX_LINE_POINTS = int(os.environ.get('DASHBOARD_MAX_LINE_POINTS', 2000)) # Points kept per line, about two per pixel of a card
+MAX_BARS = int(os.environ.get('DASHBOARD_MAX_BARS', 2000)) # Rows of a bar plot above which they are summed per abscissa and hue
+MAX_HUES = int(os.environ.get('DASHBOARD_MAX_HUES', 30)) # Hues kept in a large bar plot, the smallest are summed into 'Other'
+
+def downsample(x, y, max_points=MAX_LINE_POINTS):
+    """
+    Args:
+        x (pd.Series): sorted numeric or datetime abscissas
+        y (pd.Series): ordinates
+        max_points (int): number of points to keep at most
+    Returns:
+        x, y (pd.Series): the first and last points, and the minimum and maximum of max_points // 2 consecutive buckets,
+                          so that the peaks of a ratio are still drawn
+    """
+    x, y = pd.Series(x).reset_index(drop=True), pd.Series(y).reset_index(drop=True)
+    if len(y) <= max_points:
+        return x, y
+    buckets = np.arange(len(y)) * (max_points // 2) // len(y)
+    grouped = y.groupby(buckets, observed=True)
+    kept = np.unique(np.concatenate([[0, len(y) - 1], grouped.idxmin().dropna(), grouped.idxmax().dropna()]).astype(int))
+    return x.iloc[kept], y.iloc[kept]
+
+def line_trace(x, y, **kwargs):
+    """
+    Args:
+        x (array-like): abscissas
+        y (array-like): ordinates
+        kwargs: other go.Scatter properties
+    Returns:
+        trace (go.Scatter or go.Scattergl): line downsampled when x is sorted and numeric or datetime (categories are all kept),
+                                            drawn with WebGL above WEBGL_THRESHOLD points
+    """
+    index = pd.Index(x)
+    if len(index) > MAX_LINE_POINTS and (pd.api.types.is_numeric_dtype(index) or pd.api.types.is_datetime64_any_dtype(index)) and index.is_monotonic_increasing:
+        x, y = downsample(x, y)
+    trace_class = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace_class(x=x, y=y, **kwargs)
+
+def limit_bars(df_, x, hue_col, ylabel):
+    """
+    Args:
+        df_ (pd.DataFrame): rows of a stacked bar plot, one bar per row
+        x (str): column of the abscissas
+        hue_col (str): column of the hues, one trace each
+        ylabel (str): column of the bar heights
+    Returns:
+        df_ (pd.DataFrame): unchanged below MAX_BARS rows, otherwise summed per (x, hue) with at most MAX_HUES hues,
+                            the smallest ones summed into 'Other' (the stacks keep their height)
+    """
+    if len(df_) <= MAX_BARS:
+        return df_
+    hues = df_[hue_col]
+    totals = df_.groupby(hue_col, observed=True)[ylabel].sum().sort_values(ascending=False)
+    if len(totals) > MAX_HUES:
+        kept = totals.index[:MAX_HUES - 1]
+        hues = hues.astype(object).where(hues.isin(kept), 'Other')
+    return df_.assign(**{hue_col: hues}).groupby([x, hue_col], sort=False, observed=True)[ylabel].sum().reset_index()
 
 def generate_trace(df_, x, hues, color_dict, trace_type='bar'):
     traces = []
@@ -12,62 +78,102 @@ def generate_trace(df_, x, hues, color_dict, trace_type='bar'):
         if trace_type == 'bar':
             traces.append(go.Bar(x=df_[x], y=df_[hue], name=str(hue), hovertemplate='%{y:.0f}', marker_color=color_dict[hue], opacity=0.65, width=0.8))
         elif trace_type == 'scatter':
-            traces.append(go.Scatter(x=df_[x], y=df_[hue], yaxis='y2', name=hue+' (%)', mode="markers+lines", hovertemplate='%{y:.2f}', line=dict(color=color_dict[hue+' (%)']), visible='legendonly'))
+            traces.append(line_trace(df_[x], df_[hue], yaxis='y2', name=hue+' (%)', mode="markers+lines", hovertemplate='%{y:.2f}', line=dict(color=color_dict[hue+' (%)']), visible='legendonly'))
     return traces
 
+#####################
+# Grouped bar plots #
+#####################
+
+# Settings shared by every figure, built once and passed along with the per-figure values.
+LAYOUT_TEMPLATE = dict(
+    height=400,
+    autosize=False,
+    legend=dict(orientation="v", x=1.2, y=1),
+    barmode='stack',
+    hovermode="x unified",
+)
+
+BAR_STYLE = dict(opacity=0.65, hovertemplate='%{y:.0f}', width=0.8)
+
+CEIL_STYLE = dict(yaxis='y2', name='Ceil NOK (%)', mode="lines", hovertemplate='%{y:.2f}', visible='legendonly')
+
+# NOK (%) ceiling of the graphs whose title holds the key, DEFAULT_CEIL otherwise.
+CEIL_VALUES = {
+    "20": 1,
+    "Retoucher": 1,
+    "Condtn": 0.1,
+    "Trovalisation": 0.1,
+    "Dimensionnel": 0.1,
+    "60": 0.1,
+    "Lavage": 0.1,
+    "100 Control": 3.5
+}
+DEFAULT_CEIL = 5
+
+def ceil_value(title):
+    return CEIL_VALUES.get(next((key for key in CEIL_VALUES if key in title), ''), DEFAULT_CEIL)
+
 def add_ceil_trace(fig, df_, x, title, ceil_value, color='red'):
-    fig.add_trace(go.Scatter(x=df_[x], y=[ceil_value]*len(df_[x]), yaxis='y2', name='Ceil NOK (%)', mode="lines", hovertemplate='%{y:.2f}', line=dict(color=color, dash='dash'), visible='legendonly'))
+    abscissas = df_[x].unique() # One point per bar position, not per row of the stacks
+    fig.add_trace(line_trace(abscissas, [ceil_value]*len(abscissas), line=dict(color=color, dash='dash'), **CEIL_STYLE))
 
 def update_layout(x, df_, fig, title, xlabel, ylabel, xlabel_rotation, max_value=None):
     layout = dict(
-        height=400,
-        autosize=False,
-        legend=dict(orientation="v", x=1.2, y=1),
-        title=f'<b>{title}</b>',
-        title_y=0.95,
-        barmode='stack',
+        LAYOUT_TEMPLATE,
+        title=dict(text=f'<b>{title}</b>', y=0.95),
         xaxis_title=xlabel,
         yaxis_title=ylabel,
         xaxis_tickangle=xlabel_rotation,
-        hovermode="x unified",
     )
     if max_value:
         layout['yaxis2'] = dict(title='NOK (%)', side='right', range=[0, 1.1*max_value], overlaying='y', showgrid=False)
     fig.update_layout(**layout)
 
+def hue_colors(hues, hue_col, color_dict):
+    """
+    Args:
+        hues (list): hues of the traces
+        hue_col (str): column of the hues, the Equipment colors are looked up on the first 4 letters
+        color_dict (dict): hue to color
+    Returns:
+        colors (list): color of each hue, 'black' when it has none
+    """
+    keys = pd.Series(hues, dtype=object)
+    if hue_col == 'Equipment':
+        keys = keys.str[:4]
+    return keys.map(color_dict).fillna('black').tolist()
+
+def hue_bars(df_, x, hue_col, ylabel, color_dict):
+    """
+    Args:
+        df_ (pd.DataFrame): rows of the stacked bar plot
+        x (str): column of the abscissas
+        hue_col (str): column of the hues
+        ylabel (str): column of the bar heights
+        color_dict (dict): hue to color, see hue_colors
+    Returns:
+        traces (list): one go.Bar per hue, in order of appearance, the frame being split once by groupby
+    """
+    groups = list(df_.groupby(hue_col, sort=False, observed=True))
+    colors = hue_colors([hue for hue, _ in groups], hue_col, color_dict)
+    return [go.Bar(x=df_subset[x], y=df_subset[ylabel], name=str(hue), marker=dict(color=color), **BAR_STYLE) for (hue, df_subset), color in zip(groups, colors)]
+
 def generate_grouped_bar_plot(df_, x, hue_col, title, xlabel, ylabel, xlabel_rotation=315, filtered_df=False):
-    fig = go.Figure()
     if hue_col == 'Operator':
-        unique_hues = filtered_df[hue_col].unique()
-        for hue in unique_hues:
-            df_subset = filtered_df[filtered_df[hue_col] == hue]
-            color = load_color_dict_operator(df_subset).get(hue, 'black')
-            fig.add_trace(go.Bar(x=df_subset[x], y=df_subset[ylabel], name=str(hue), opacity=0.65, marker=dict(color=color), hovertemplate='%{y:.0f}', width=0.8))
+        color_dict = load_color_dict_operator(filtered_df)
+        bars_df = limit_bars(filtered_df, x, hue_col, ylabel)
     else:
-        unique_hues = df_[hue_col].unique()
         color_dict = {
             'Shift': SHIFT_COLOR_DICT,
             'Equipment': COLOR_DICT_EQUIPMENT,
-            'Type': returns_defaults_color_dict()
+            'Type': DEFAULTS_CATALOG.colors()
         }.get(hue_col, {})
-        for hue in unique_hues:
-            df_subset = df_[df_[hue_col] == hue]
-            color = color_dict.get(hue[:4] if hue_col == 'Equipment' else hue, 'black')
-            fig.add_trace(go.Bar(x=df_subset[x], y=df_subset[ylabel], name=str(hue), opacity=0.65, marker=dict(color=color), hovertemplate='%{y:.0f}', width=0.8))
-    
+        bars_df = limit_bars(df_, x, hue_col, ylabel)
+    fig = go.Figure(data=hue_bars(bars_df, x, hue_col, ylabel, color_dict))
+
     if "N° CONS" not in title and "60" not in title:
-        ceil_dict = {
-            "20": 1,
-            "Retoucher": 1,
-            "Condtn": 0.1,
-            "Trovalisation": 0.1,
-            "Dimensionnel": 0.1,
-            "60": 0.1,
-            "Lavage": 0.1,
-            "100 Control": 3.5
-        }
-        y_line = ceil_dict.get(next((key for key in ceil_dict if key in title), ''), 5)
-        add_ceil_trace(fig, df_, x, title, y_line)
+        add_ceil_trace(fig, df_, x, title, ceil_value(title))
     update_layout(x, df_, fig, title, xlabel, ylabel, xlabel_rotation)
     fig.update_xaxes(tick0=0, dtick=1, title_standoff=30)
     if pd.api.types.is_integer(df_[x]):
@@ -93,26 +199,11 @@ def generate_bar_plot_no_hues(df_, x, title, xlabel, ylabel, xlabel_rotation=315
     return fig
 
 def generate_custom_bar_plot(df, x, hue_col, title, xlabel, ylabel, xlabel_rotation=315):
-    fig = go.Figure()
-    unique_hues = df[hue_col].unique()
-    color_dict = returns_defaults_color_dict()
-
-    for hue in unique_hues:
-        df_subset = df[df[hue_col] == hue]
-        color = color_dict.get(hue, 'black')  # Default color if not found in the dictionary
-        fig.add_trace(go.Bar(
-            x=df_subset[x], 
-            y=df_subset[ylabel], 
-            name=str(hue), 
-            opacity=0.65, 
-            marker=dict(color=color), 
-            hovertemplate='%{y:.0f}',
-            width=0.8,
-        ))
+    fig = go.Figure(data=hue_bars(df, x, hue_col, ylabel, DEFAULTS_CATALOG.colors()))
 
     update_layout(x, df, fig, title, xlabel, ylabel, xlabel_rotation)
     fig.update_xaxes(tick0=0, dtick=1)
     if pd.api.types.is_integer(df[x]):
         fig.update_xaxes(tick0=0, dtick=1, range=[df[x].min(), df[x].max()])
 
-    return fig
\ No newline at end of file
+    return fig
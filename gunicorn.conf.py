@@ -0,0 +1,23 @@
+"""
+Module related to the gunicorn settings of the dashboard, read when gunicorn wsgi:server is run from the repository root.
+"""
+
+import os, tempfile
+
+from metrics import clear_metrics_dir, mark_process_dead
+
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8180')
+workers = int(os.environ.get('DASHBOARD_WORKERS', 4))
+threads = int(os.environ.get('DASHBOARD_THREADS', 8)) # Threads of each worker, the SQLite reads release the GIL
+worker_class = 'gthread'
+preload_app = True # wsgi.py (app and warmed caches) is imported once in the master, then the workers are forked
+timeout = 120
+
+# Directory where each worker writes its metrics, summed on /metrics whichever worker answers (see metrics.py)
+os.environ.setdefault('DASHBOARD_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_metrics_' + bind.rsplit(':', 1)[-1]))
+
+def on_starting(server):
+    clear_metrics_dir()
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
@@ -0,0 +1,274 @@
+"""
+Module related to the performance metrics of the callbacks, exposed in the Prometheus text format on /metrics.
+
+Every server callback is wrapped once all of them are registered (instrument_callbacks). For each call we record :
+    - the wall time, serialization of the response included;
+    - the time spent in SQLite and the number of rows fetched (db.TimedCursor, nothing when the loaders cache answered);
+    - the number of rows returned by filter_dataframe;
+    - the figure build time, from the last of these data steps to the response;
+    - the size of the JSON response.
+Callbacks are labelled by their output id (the graph title for the graphs). Background callbacks are only measured while
+dispatching their jobs (the jobs run in other processes).
+
+With several worker processes (gunicorn, see gunicorn.conf.py), DASHBOARD_METRICS_DIR is a directory shared by all of
+them, as the multiprocess mode of prometheus_client : each process writes its metrics to its own file after every
+callback, and a scrape sums the histograms of every file, whichever worker answers it. The files of the exited workers
+keep counting, a new process with the same pid starts from its file. The cache sizes are given per live process (pid
+label). Without DASHBOARD_METRICS_DIR, the process answering the scrape only reports its own callbacks.
+"""
+
+import os, time, threading, json, glob
+
+from functools import wraps
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30) # Seconds
+ROWS_BUCKETS = (0, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+class Histogram:
+    """
+    Prometheus histogram with one label, callback.
+    """
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values = {} # callback -> [count of each bucket, sum, count]
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return {callback: list(values) for callback, values in self._values.items()}
+
+    def load(self, values):
+        with self._lock:
+            self._values = {callback: list(counts) for callback, counts in values.items()}
+
+    def observe(self, callback, value):
+        with self._lock:
+            values = self._values.setdefault(callback, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[i] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self, values=None):
+        """
+        Args:
+            values (dict): callback -> counts to render (see merge_values), those of this process when None
+        Returns:
+            lines (list): lines of the histogram in the Prometheus text format
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        items = sorted((values if values is not None else self.snapshot()).items())
+        for callback, values in items:
+            label = f'callback="{escape_label(callback)}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{label}}} {values[-2]}')
+            lines.append(f'{self.name}_count{{{label}}} {values[-1]}')
+        return lines
+
+HISTOGRAMS = {
+    'duration': Histogram('dashboard_callback_duration_seconds', 'Wall time of the callback, response serialization included.', DURATION_BUCKETS),
+    'sql': Histogram('dashboard_callback_sql_seconds', 'Time spent executing SQLite queries and fetching their rows.', DURATION_BUCKETS),
+    'figure': Histogram('dashboard_callback_figure_seconds', 'Time from the last data step (SQL fetch or filter_dataframe) to the response.', DURATION_BUCKETS),
+    'rows_loaded': Histogram('dashboard_callback_rows_loaded', 'Rows fetched from SQLite.', ROWS_BUCKETS),
+    'rows_filtered': Histogram('dashboard_callback_rows_filtered', 'Rows returned by filter_dataframe.', ROWS_BUCKETS),
+    'response_bytes': Histogram('dashboard_callback_response_bytes', 'Size of the JSON response.', BYTES_BUCKETS),
+}
+
+_local = threading.local()
+
+_process = {'pid': None} # Process whose metrics are in HISTOGRAMS, see process_started
+_file_lock = threading.Lock()
+
+class CallbackRecord:
+    """
+    Measures of the callback running in the current thread.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.data_ready = self.start
+        self.sql_seconds = 0.0
+        self.rows_loaded = 0
+        self.rows_filtered = 0
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def record_sql(seconds, rows):
+    record = getattr(_local, 'record', None)
+    if record is not None:
+        record.sql_seconds += seconds
+        record.rows_loaded += rows
+        record.data_ready = time.perf_counter()
+
+def record_filtered(rows):
+    record = getattr(_local, 'record', None)
+    if record is not None:
+        record.rows_filtered += rows
+        record.data_ready = time.perf_counter()
+
+def metrics_dir():
+    return os.environ.get('DASHBOARD_METRICS_DIR')
+
+def process_file(pid):
+    return os.path.join(metrics_dir(), f'metrics_{pid}.json')
+
+def read_process_file(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError): # Being replaced by its process, or exited while it was written
+        return {}
+
+def process_started():
+    """
+    Starts the metrics of this process once : after a fork, the histograms of the parent are dropped, and those of an
+    exited process of the same pid (its file) are carried on.
+    """
+    pid = os.getpid()
+    if _process['pid'] == pid:
+        return
+    with _file_lock:
+        if _process['pid'] != pid:
+            data = read_process_file(process_file(pid)) if metrics_dir() else {}
+            if data or _process['pid'] is not None:
+                for key, histogram in HISTOGRAMS.items():
+                    histogram.load(data.get('histograms', {}).get(key, {}))
+            _process['pid'] = pid
+
+def write_process_file():
+    # Replaced at once, so that a scrape never reads half a file
+    from cache import cache_stats # cache imports db, which imports this module
+    data = {
+        'histograms': {key: histogram.snapshot() for key, histogram in HISTOGRAMS.items()},
+        'cache_bytes': {name: stats['bytes'] for name, stats in cache_stats().items()},
+        'live': True,
+    }
+    path = process_file(os.getpid())
+    with _file_lock:
+        with open(path + '.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(path + '.tmp', path)
+
+def mark_process_dead(pid):
+    """
+    Args:
+        pid (int): exited worker process (gunicorn child_exit hook), its histograms keep counting but not its caches
+    """
+    if not metrics_dir():
+        return
+    path = process_file(pid)
+    data = read_process_file(path)
+    if data:
+        data['live'] = False
+        with open(path + '.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(path + '.tmp', path)
+
+def clear_metrics_dir():
+    # Called by the gunicorn master before the workers are forked (on_starting hook), the counters start from 0.
+    if not metrics_dir():
+        return
+    os.makedirs(metrics_dir(), exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir(), 'metrics_*.json*')):
+        os.remove(path)
+
+def merge_values(all_values):
+    """
+    Args:
+        all_values (list): callback -> counts of a histogram, one dict per process
+    Returns:
+        values (dict): callback -> counts summed over the processes
+    """
+    merged = {}
+    for values in all_values:
+        for callback, counts in values.items():
+            total = merged.setdefault(callback, [0] * len(counts))
+            for i, count in enumerate(counts):
+                total[i] += count
+    return merged
+
+def collect_processes():
+    """
+    Returns:
+        histograms (dict): HISTOGRAMS key -> callback -> counts, summed over every process file
+        cache_bytes (dict): pid -> cache -> bytes of the live processes
+    """
+    write_process_file()
+    files = {}
+    for path in glob.glob(os.path.join(metrics_dir(), 'metrics_*.json')):
+        data = read_process_file(path)
+        if data:
+            files[int(os.path.basename(path)[len('metrics_'):-len('.json')])] = data
+    histograms = {key: merge_values([data.get('histograms', {}).get(key, {}) for data in files.values()]) for key in HISTOGRAMS}
+    cache_bytes = {pid: data.get('cache_bytes', {}) for pid, data in files.items() if data.get('live')}
+    return histograms, cache_bytes
+
+def callback_name(output):
+    """
+    Args:
+        output (str): key of app.callback_map, e.g. 'Ten: NOK by Type per week.figure' or '..a.children...b.children..'
+    Returns:
+        name (str): id of the output(s), e.g. 'Ten: NOK by Type per week'
+    """
+    return ', '.join(part.rsplit('.', 1)[0] for part in output.strip('.').split('...'))
+
+def instrument(name, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        process_started()
+        record = _local.record = CallbackRecord()
+        response = None
+        try:
+            response = func(*args, **kwargs)
+            return response
+        finally:
+            _local.record = None
+            end = time.perf_counter()
+            HISTOGRAMS['duration'].observe(name, end - record.start)
+            HISTOGRAMS['sql'].observe(name, record.sql_seconds)
+            HISTOGRAMS['figure'].observe(name, end - record.data_ready)
+            HISTOGRAMS['rows_loaded'].observe(name, record.rows_loaded)
+            HISTOGRAMS['rows_filtered'].observe(name, record.rows_filtered)
+            HISTOGRAMS['response_bytes'].observe(name, len(response) if isinstance(response, (str, bytes)) else 0)
+            if metrics_dir():
+                write_process_file()
+    return wrapper
+
+def render_metrics():
+    process_started()
+    if metrics_dir():
+        histograms, cache_bytes = collect_processes()
+    else:
+        from cache import cache_stats # cache imports db, which imports this module
+        histograms = {key: None for key in HISTOGRAMS}
+        cache_bytes = {os.getpid(): {name: stats['bytes'] for name, stats in cache_stats().items()}}
+
+    lines = []
+    for key, histogram in HISTOGRAMS.items():
+        lines.extend(histogram.render(histograms[key]))
+    lines.append('# HELP dashboard_process_id Process answering this scrape.')
+    lines.append('# TYPE dashboard_process_id gauge')
+    lines.append(f'dashboard_process_id {os.getpid()}')
+    lines.append('# HELP dashboard_cache_bytes Memory of the dataframes kept by each loader cache of each live process.')
+    lines.append('# TYPE dashboard_cache_bytes gauge')
+    for pid, caches in sorted(cache_bytes.items()):
+        for name, size in sorted(caches.items()):
+            lines.append(f'dashboard_cache_bytes{{cache="{escape_label(name)}",pid="{pid}"}} {size}')
+    return '\n'.join(lines) + '\n'
+
+def instrument_callbacks(app):
+    """
+    Args:
+        app (dash.Dash): application, once every callback is registered
+    Wraps every server callback (the browser ones have nothing to measure) and adds the /metrics route.
+    """
+    for output, callback in app.callback_map.items():
+        if 'callback' in callback:
+            callback['callback'] = instrument(callback_name(output), callback['callback'])
+    app.server.add_url_rule('/metrics', 'metrics', lambda: (render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}))
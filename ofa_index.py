@@ -0,0 +1,166 @@
+"""
+Module related to the ofa_equipment index of database1.db : the equipments every ofa of uu_tracking was run on.
+
+For each ofa, equipment holds its standardized equipment names (as utils.standardize_equipment_name, sorted and joined
+with ', '), equipment_count their number, mismatch whether there is more than one, and last_update its latest dte.
+create_db.py maintains it with uu_tracking, in the same transaction, recomputing only the ofas of the written rows.
+load_pp_data joins it in SQL for the Equipment of the post-processing rows, and the Mismatches tab pages through
+its ofa_mismatch view (the mismatched ofas), one query per page.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from cache import DataFrameCache
+from db import get_connection, table_exists
+from filters import split_filter_query
+
+OFA_INDEX_SOURCE = 'uu_tracking'
+
+OFA_INDEX_COLUMNS = ['ofa', 'equipment', 'equipment_count', 'mismatch', 'last_update']
+
+OFA_INDEX_CACHE = DataFrameCache('ofa_index', 'database1.db', maxsize=1)
+
+# Columns of the Mismatches table : displayed value, compared value (filters) and sorted value, as SQL expressions over ofa_mismatch
+MISMATCH_COLUMNS = {
+    'ofa': ('ofa', 'ofa', 'ofa'),
+    'Equipment List': ('equipment', 'equipment', 'equipment'),
+    'Last Update': ("strftime('%d-%m-%Y', last_update)", 'date(last_update)', 'last_update'),
+}
+
+def create_ofa_index(cursor):
+    cursor.execute('CREATE TABLE IF NOT EXISTS ofa_equipment (ofa TEXT PRIMARY KEY, equipment TEXT, equipment_count INTEGER, mismatch INTEGER, last_update TEXT)')
+    # The Mismatches table pages through the mismatched ofas, latest first by default
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ofa_equipment_mismatch ON ofa_equipment (mismatch, last_update)')
+    cursor.execute('CREATE VIEW IF NOT EXISTS ofa_mismatch AS select ofa, equipment, last_update from ofa_equipment where mismatch = 1')
+
+def ofa_index_built(cursor):
+    # The table is created and filled in the same transaction.
+    return table_exists(cursor, 'ofa_equipment')
+
+def compute_ofa_index(df):
+    """
+    Args:
+        df (pd.DataFrame): 'ofa', 'pdc' and 'dte' of uu_tracking rows, every row of each ofa
+    Returns:
+        df_index (pd.DataFrame): one line per ofa, with the OFA_INDEX_COLUMNS
+    """
+    df = df[df['ofa'].notna()]
+    equipments = df.assign(equipment=df['pdc'].str.replace(r'-\d+$', '', regex=True))[['ofa', 'equipment']]
+    equipments = equipments.dropna().drop_duplicates().sort_values(['ofa', 'equipment'])
+    by_ofa = equipments.groupby('ofa')['equipment']
+
+    df_index = df.groupby('ofa')['dte'].max().rename('last_update').to_frame()
+    df_index['equipment'] = by_ofa.agg(', '.join)
+    df_index['equipment_count'] = by_ofa.size().reindex(df_index.index, fill_value=0)
+    df_index['mismatch'] = (df_index['equipment_count'] > 1).astype(int)
+    return df_index.reset_index()[OFA_INDEX_COLUMNS]
+
+def refresh_ofa_index(conn, incremental):
+    """
+    Args:
+        conn (sqlite3.Connection): connection to database1.db, inside the ingestion transaction of uu_tracking
+        incremental (bool): rollups.track_changes was called before the ingestion, only recompute the touched ofas
+                            (otherwise, table rebuilt or index not built yet, every ofa is recomputed)
+    Returns:
+        rows_written (int): number of index rows written
+    """
+    cursor = conn.cursor()
+    create_ofa_index(cursor)
+    where = "WHERE ofa IN (select ofa from touched_rows where source = 'uu_tracking')" if incremental else ''
+    cursor.execute(f'DELETE FROM ofa_equipment {where}')
+    df_index = compute_ofa_index(pd.read_sql_query(f'select ofa, pdc, dte from uu_tracking {where}', conn))
+    rows = df_index.astype(object).where(df_index.notna(), None).itertuples(index=False, name=None)
+    cursor.executemany(f'INSERT INTO ofa_equipment ({", ".join(OFA_INDEX_COLUMNS)}) VALUES ({", ".join("?" for _ in OFA_INDEX_COLUMNS)})', rows)
+    return len(df_index)
+
+def load_ofa_index():
+    """
+    Returns:
+        df_index (pd.DataFrame): 'ofa', 'Equipment', 'Equipment Count', 'Mismatch' and 'Last Update' of every ofa,
+                                 read from ofa_equipment (computed from uu_tracking until create_db.py has built it)
+                                 and cached until database1.db changes
+    """
+    version = OFA_INDEX_CACHE.current_version()
+    df_index = OFA_INDEX_CACHE.get('index')
+    if df_index is None:
+        conn = get_connection('database1.db')
+        if ofa_index_built(conn.cursor()):
+            df_index = pd.read_sql_query(f'select {", ".join(OFA_INDEX_COLUMNS)} from ofa_equipment', conn)
+        else:
+            df_index = compute_ofa_index(pd.read_sql_query('select ofa, pdc, dte from uu_tracking', conn))
+        df_index.columns = ['ofa', 'Equipment', 'Equipment Count', 'Mismatch', 'Last Update']
+        df_index['Mismatch'] = df_index['Mismatch'].astype(bool)
+        OFA_INDEX_CACHE.set('index', df_index, version)
+    return df_index.copy()
+
+def mismatch_filter(filter_query):
+    """
+    Args:
+        filter_query (str): filter_query of the Mismatches table (see filters.split_filter_query)
+    Returns:
+        where (str): WHERE clause over ofa_mismatch, empty without filter
+        params (list): values of its parameters
+    """
+    clauses, params = [], []
+    for column, operator, value, case_insensitive in split_filter_query(filter_query):
+        if column not in MISMATCH_COLUMNS:
+            continue
+        displayed, compared, _ = MISMATCH_COLUMNS[column]
+        if operator in ('contains', 'datestartswith'): # On the displayed text
+            expression, value = (f'lower({displayed})', value.lower()) if case_insensitive else (displayed, value)
+            clauses.append(f'instr({expression}, ?) > 0' if operator == 'contains' else f'substr({expression}, 1, length(?)) = ?')
+            params.extend([value] if operator == 'contains' else [value, value])
+        else:
+            if column == 'Last Update': # Typed as displayed (day first), compared as ISO dates
+                date = pd.to_datetime(value, dayfirst=True, errors='coerce')
+                value = value if pd.isna(date) else date.strftime('%Y-%m-%d')
+            expression, value = (f'lower({compared})', value.lower()) if case_insensitive else (compared, value)
+            clauses.append(f'{expression} {operator} ?')
+            params.append(value)
+    return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+def mismatch_connection():
+    """
+    Returns:
+        conn (sqlite3.Connection): database1.db, or while create_db.py has not built ofa_equipment,
+                                   a database in memory holding the mismatched ofas of load_ofa_index
+        owned (bool): the connection is a database in memory, to be closed by the caller
+    """
+    conn = get_connection('database1.db')
+    if ofa_index_built(conn.cursor()):
+        return conn, False
+    df_index = load_ofa_index()
+    df_index = df_index[df_index['Mismatch']].astype({'Mismatch': int})
+    rows = df_index.astype(object).where(df_index.notna(), None).itertuples(index=False, name=None)
+    conn = sqlite3.connect(':memory:')
+    create_ofa_index(conn.cursor())
+    conn.executemany(f'INSERT INTO ofa_equipment ({", ".join(OFA_INDEX_COLUMNS)}) VALUES ({", ".join("?" for _ in OFA_INDEX_COLUMNS)})', rows)
+    return conn, True
+
+def load_mismatch_page(page_current, page_size, sort_by, filter_query):
+    """
+    Args:
+        page_current (int): page of the Mismatches table, from 0
+        page_size (int): number of rows per page
+        sort_by (list): sort_by of the table, {'column_id', 'direction'} dicts, latest update first when empty
+        filter_query (str): filter_query of the table
+    Returns:
+        df_page (pd.DataFrame): 'ofa', 'Equipment List' and 'Last Update' of the mismatched ofas of the page,
+                                read in one indexed query over ofa_mismatch
+        page_count (int): number of pages of the filtered table
+    """
+    where, params = mismatch_filter(filter_query)
+    order = [f"{MISMATCH_COLUMNS[sort['column_id']][2]} {'DESC' if sort['direction'] == 'desc' else 'ASC'}" for sort in sort_by if sort['column_id'] in MISMATCH_COLUMNS]
+    order = ', '.join((order or ['last_update DESC']) + ['ofa']) # ofa keeps the pages stable
+    displayed = ', '.join(f'{expression} as "{column}"' for column, (expression, _, _) in MISMATCH_COLUMNS.items())
+
+    conn, owned = mismatch_connection()
+    try:
+        row_count = conn.execute(f'select count(*) from ofa_mismatch {where}', params).fetchone()[0]
+        df_page = pd.read_sql_query(f'select {displayed} from ofa_mismatch {where} order by {order} limit ? offset ?', conn, params=params + [page_size, page_current * page_size])
+    finally:
+        if owned:
+            conn.close()
+    return df_page, max(1, -(-row_count // page_size))
@@ -13,10 +13,13 @@ from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc 
-from pp_load import load_df_twenty, load_df_hundred
+from pp_load import load_pp_operations
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT, COLOR_DICT_GLOBAL
+from generate_plots import line_trace
 from utils import load_operator_label, load_equipment_label
+from rollups import load_weekly_smc, load_weekly_operations
+from clientside import register_modal_graphs
 
 def overall_scrap_layout_callbacks(app):
 
@@ -25,10 +28,7 @@ def overall_scrap_layout_callbacks(app):
     ####################################################################
 
     @app.callback(
-        [
         Output('NOK of 10, 20, 100 Control per week', 'figure'),
-        Output('NOK of 10, 20, 100 Control per week (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -42,14 +42,14 @@ def overall_scrap_layout_callbacks(app):
 
         def process_data(df, df_name_ratio, df_name_nok, df_name_ok):
             filtered_df = filter_dataframe(df, input_values)  #filter the df
-            OK_Total = filtered_df.groupby('Week')['OK'].sum().reindex(all_weeks, fill_value=1)
-            NOK_Total = filtered_df.groupby('Week')['NOK'].sum().reindex(all_weeks, fill_value=0)
+            OK_Total = filtered_df.groupby('Week', observed=True)['OK'].sum().reindex(all_weeks, fill_value=1)
+            NOK_Total = filtered_df.groupby('Week', observed=True)['NOK'].sum().reindex(all_weeks, fill_value=0)
             NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
             return pd.DataFrame({'Week': all_weeks, df_name_ratio: NOK_Ratio.values, df_name_nok: NOK_Total.values, df_name_ok: OK_Total.values})
 
-        df_smc_copy = load_df_smc(input_values)
-        df_twenty = load_df_twenty(input_values)
-        df_visuel = load_df_hundred(input_values)
+        df_smc_copy, _ = load_weekly_smc(input_values)
+        df_by_operation = load_weekly_operations(input_values, ['20', '100'])
+        (df_twenty, _), (df_visuel, _) = df_by_operation['20'], df_by_operation['100']
 
         df_smc_copy['Equipment'] = df_smc_copy['Equipment'].apply(lambda x: x[:-2] if x.startswith("Equipment2") else x)
 
@@ -69,16 +69,16 @@ def overall_scrap_layout_callbacks(app):
         fig = go.Figure()  #create a figure
         for column in df_names_nok:
             fig.add_trace(go.Bar(hovertemplate='%{y:.2f}', x=final_df['Week'], y=final_df[column], name=column, yaxis='y1', marker_color=COLOR_DICT_GLOBAL[column], opacity=0.65))
-            fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Week'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
+            fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Week'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
 
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Week'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Week'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         ymax = 1.1* final_df['NOK (%)'].max()
 
         fig.update_layout(barmode='stack', height=400, title='<b>' + title + '</b>', hovermode="x unified", xaxis_title="Weeks")  #update layout
         fig.update_layout(yaxis=dict(title='NOK', side='left', showgrid=False), yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False, range=[0,ymax]), autosize=True, legend=dict(orientation="v", x=1.2, y=1))
         fig.update_xaxes(tick0=0, dtick=1, tickangle=315, title_standoff=30)
         
-        return fig, fig
+        return fig
 
 
     ############################################################################
@@ -86,10 +86,7 @@ def overall_scrap_layout_callbacks(app):
     ############################################################################
 
     @app.callback(
-        [
         Output('NOK (%) of 10, 20, 100 Control per Operator', 'figure'),
-        Output('NOK (%) of 10, 20, 100 Control per Operator (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -104,14 +101,14 @@ def overall_scrap_layout_callbacks(app):
         def process_data(df, df_name_ratio, df_name_nok, df_name_ok):
             filtered_df = filter_dataframe(df, input_values)  #filter the df
             all_Operators = filtered_df['Operator'].unique()
-            OK_Total = filtered_df.groupby('Operator')['OK'].sum().reindex(all_Operators, fill_value=1)
-            NOK_Total = filtered_df.groupby('Operator')['NOK'].sum().reindex(all_Operators, fill_value=0)
+            OK_Total = filtered_df.groupby('Operator', observed=True)['OK'].sum().reindex(all_Operators, fill_value=1)
+            NOK_Total = filtered_df.groupby('Operator', observed=True)['NOK'].sum().reindex(all_Operators, fill_value=0)
             NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
             return pd.DataFrame({'Operator': all_Operators, df_name_ratio: NOK_Ratio.values, df_name_nok: NOK_Total.values, df_name_ok: OK_Total.values})
 
         df_smc_copy = load_df_smc(input_values)
-        df_twenty = load_df_twenty(input_values)
-        df_visuel = load_df_hundred(input_values)
+        df_by_operation = load_pp_operations(input_values, ['20', '100'])
+        df_twenty, df_visuel = df_by_operation['20'], df_by_operation['100']
         df_smc_copy['Equipment'] = df_smc_copy['Equipment'].apply(lambda x: x[:-2] if x.startswith("Equipment2") else x)
 
         dfs = [df_twenty, df_visuel, df_smc_copy]
@@ -128,25 +125,22 @@ def overall_scrap_layout_callbacks(app):
         final_df.sort_values(by=['NOK (%)', 'NOK 10 (%)', 'NOK 100 (%)', 'NOK 20 (%)'], ascending=False, inplace=True)
         for column in df_names_nok:
             fig.add_trace(go.Bar(hovertemplate='%{y:.2f}', x=final_df['Operator'], y=final_df[column], name=column, yaxis='y1', marker_color=COLOR_DICT_GLOBAL[column], opacity=0.65))
-            fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Operator'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
+            fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Operator'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
 
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Operator'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Operator'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         ymax = 1.1* final_df['NOK (%)'].max()
 
         fig.update_layout(barmode='stack', height=400, title='<b>' + title + '</b>', hovermode="x unified", xaxis_title="Operators")  #update layout
         fig.update_layout(yaxis=dict(title='NOK', side='left', showgrid=False), yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False, range=[0,ymax]), autosize=True, legend=dict(orientation="v", x=1.2, y=1))
         fig.update_xaxes(tick0=0, dtick=1, tickangle=315, title_standoff=30)
-        return fig, fig
+        return fig
 
     #############################################################################
     # 3rd Graph : NOK (%) of 10, 20, 100 Control per Equipment #
     #############################################################################
 
     @app.callback(
-        [
         Output('NOK (%) of 10, 20, 100 Control per Equipment', 'figure'),
-        Output('NOK (%) of 10, 20, 100 Control per Equipment (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -161,14 +155,14 @@ def overall_scrap_layout_callbacks(app):
         def process_data(df, df_name_ratio, df_name_nok, df_name_ok):
             filtered_df = filter_dataframe(df, input_values)  #filter the df
             all_Equipments = filtered_df['Equipment'].unique()
-            OK_Total = filtered_df.groupby('Equipment')['OK'].sum().reindex(all_Equipments, fill_value=1)
-            NOK_Total = filtered_df.groupby('Equipment')['NOK'].sum().reindex(all_Equipments, fill_value=0)
+            OK_Total = filtered_df.groupby('Equipment', observed=True)['OK'].sum().reindex(all_Equipments, fill_value=1)
+            NOK_Total = filtered_df.groupby('Equipment', observed=True)['NOK'].sum().reindex(all_Equipments, fill_value=0)
             NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
             return pd.DataFrame({'Equipment': all_Equipments, df_name_ratio: NOK_Ratio.values, df_name_nok: NOK_Total.values, df_name_ok: OK_Total.values})
 
         df_smc_copy = load_df_smc(input_values)
-        df_twenty = load_df_twenty(input_values)
-        df_visuel = load_df_hundred(input_values)
+        df_by_operation = load_pp_operations(input_values, ['20', '100'])
+        df_twenty, df_visuel = df_by_operation['20'], df_by_operation['100']
         df_smc_copy['Equipment'] = df_smc_copy['Equipment'].apply(lambda x: x[:-2] if x.startswith("Equipment2") else x)
 
         dfs = [df_twenty, df_visuel, df_smc_copy]
@@ -187,15 +181,21 @@ def overall_scrap_layout_callbacks(app):
 
         for column in df_names_nok:
             fig.add_trace(go.Bar(hovertemplate='%{y:.2f}', x=final_df['Equipment'], y=final_df[column], name=column, yaxis='y1', marker_color=COLOR_DICT_GLOBAL[column], opacity=0.65))
-            fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Equipment'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
+            fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Equipment'], y=final_df[column + ' (%)'], name=column + ' (%)', yaxis='y2', marker_color=COLOR_DICT_GLOBAL[column]))
 
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Equipment'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=final_df['Equipment'], y=final_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         ymax = 1.1* final_df['NOK (%)'].max()
 
         fig.update_layout(barmode='stack', height=400, title='<b>' + title + '</b>', hovermode="x unified", xaxis_title="Equipments")  #update layout
         fig.update_layout(yaxis=dict(title='NOK', side='left', showgrid=False), yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False, range=[0,ymax]), autosize=True, legend=dict(orientation="v", x=1.2, y=1))
         fig.update_xaxes(tick0=0, dtick=1, tickangle=315, title_standoff=30)
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [
+        'NOK of 10, 20, 100 Control per week',
+        'NOK (%) of 10, 20, 100 Control per Operator',
+        'NOK (%) of 10, 20, 100 Control per Equipment',
+    ])
 
 def overall_scrap_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -7,16 +7,18 @@ Corresponding CSV file : pp_tracking.csv.
 
 import datetime
 
-import dash_bootstrap_components as dbc, pandas as pd, numpy as np, plotly.graph_objects as go
+import dash_bootstrap_components as dbc, pandas as pd, numpy as np
 
 from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from pp_load import load_df_fifty
-from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues
+from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT
 from utils import load_operator_label, load_equipment_label, extract_type
+from rollups import load_weekly_operation
+from clientside import register_modal_graphs
 
 FIRST_GRAPH = "50: NOK by Type per week"
 SECOND_GRAPH = "50: NOK by Type per Collaborator"
@@ -27,8 +29,11 @@ FIFTH_GRAPH = "50: NOK per Type"
 def create_graph(input_values, title_name, hue):
     title = generate_title(input_values, title_name)
 
-    df_fifty = load_df_fifty(input_values)
-    df_fifty_type = extract_type(df_fifty)
+    if hue == 'Week':
+        df_fifty, df_fifty_type = load_weekly_operation(input_values, '50')
+    else:
+        df_fifty = load_df_fifty(input_values)
+        df_fifty_type = extract_type(df_fifty)
 
     filtered_df = filter_dataframe(df_fifty, input_values)
     filtered_df_type = filter_dataframe(df_fifty_type, input_values)
@@ -36,12 +41,12 @@ def create_graph(input_values, title_name, hue):
     week_start, week_end = input_values['Week']
     all_weeks = np.arange(week_start, week_end+1)
 
-    df_Week = filtered_df_type.groupby([hue, 'Type'])[['NOK by Type']].sum().reset_index()
+    df_Week = filtered_df_type.groupby([hue, 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
     df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
     df_Week.reset_index(drop=True, inplace=True)
     fig = generate_grouped_bar_plot(df_Week, hue, 'Type', title, hue + 's', 'NOK by Type')
-    OK_Total = filtered_df.groupby(hue)['OK'].sum()
-    NOK_Total = filtered_df.groupby(hue)['NOK'].sum()
+    OK_Total = filtered_df.groupby(hue, observed=True)['OK'].sum()
+    NOK_Total = filtered_df.groupby(hue, observed=True)['NOK'].sum()
 
     OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
     NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
@@ -49,7 +54,7 @@ def create_graph(input_values, title_name, hue):
     NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
     team_ratio_df = pd.DataFrame({hue: all_weeks, 'NOK (%)': NOK_Ratio.values})
-    fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[hue], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+    fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[hue], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
     if NOK_Ratio.size > 0:
         ymax = 1.1* NOK_Ratio.values.max()
         fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
@@ -64,10 +69,7 @@ def register_fifty_callbacks(app):
     ########################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -79,17 +81,14 @@ def register_fifty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator, 'Equipment': selected_equipment}
         fig = create_graph(input_values, FIRST_GRAPH, 'Week')
 
-        return fig, fig
+        return fig
 
     ################################################
     # 2nd Graph : 50: NOK by Type per Collaborator #
     ################################################
 
     @app.callback(
-        [
         Output(SECOND_GRAPH, 'figure'),
-        Output(SECOND_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -100,17 +99,14 @@ def register_fifty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': selected_equipment}
         fig = create_graph(input_values, SECOND_GRAPH, 'Collaborator')
 
-        return fig, fig
+        return fig
 
     ############################################
     # 3rd Graph : 50: NOK by Type per Operator #
     ############################################
 
     @app.callback(
-        [
         Output(THIRD_GRAPH, 'figure'),
-        Output(THIRD_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -122,17 +118,14 @@ def register_fifty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator, 'Equipment': selected_equipment}
         fig = create_graph(input_values, THIRD_GRAPH, 'Operator')
 
-        return fig, fig
+        return fig
 
     #############################################
     # 4th Graph : 50: NOK by Type per Equipment #
     #############################################
 
     @app.callback(
-        [
         Output(FOURTH_GRAPH, 'figure'),
-        Output(FOURTH_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 4', 'value'),
         Input('Week Selector 4', 'value'),
@@ -143,17 +136,14 @@ def register_fifty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': selected_equipment}
         fig = create_graph(input_values, FOURTH_GRAPH, 'Equipment')
 
-        return fig, fig
+        return fig
     
     ################################
     # 5th Graph : 50: NOK per Type #
     ################################
 
     @app.callback(
-        [
         Output(FIFTH_GRAPH, 'figure'),
-        Output(FIFTH_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 5', 'value'),
         Input('Week Selector 5', 'value'),
@@ -169,12 +159,14 @@ def register_fifty_callbacks(app):
 
         filtered_df_type = filter_dataframe(df_fifty_type, input_values)
 
-        df_Equipment = filtered_df_type.groupby('Type')['NOK by Type'].sum().reset_index()
+        df_Equipment = filtered_df_type.groupby('Type', observed=True)['NOK by Type'].sum().reset_index()
         df_Equipment = df_Equipment.sort_values(by='NOK by Type', ascending=False)  # Sort by decreasing value of NOK
 
         fig = generate_bar_plot_no_hues(df_Equipment, 'Type', title, 'Type', 'NOK by Type')
         
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH, SECOND_GRAPH, THIRD_GRAPH, FOURTH_GRAPH, FIFTH_GRAPH])
 
 def fifty_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -13,10 +13,12 @@ from dash.dependencies import Input, Output
 
 from pp_load import load_pp_data
 from erp_load import df_erp_load
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, COLOR_DICT_EQUIPMENT, WEEK_DICT, OPERATIONS_LIST
 from utils import load_equipment_label, extract_type
+from clientside import register_modal_graphs
+from background import background_graph
 
 def register_ofa_overall_callbacks(app):
 
@@ -25,19 +27,17 @@ def register_ofa_overall_callbacks(app):
     ###################################################################
 
     @app.callback(
-        [
         Output('NOK (%) from each Ten Equipment per Op', 'figure'),
-        Output('NOK (%) from each Ten Equipment per Op (bis)', 'figure'),
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
         Input('Equipment Dropdown 1', 'value'),
-        ]
+        ],
+        **background_graph('NOK (%) from each Ten Equipment per Op')
     )
     def update_1(selected_year, selected_week, equipment_value):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': equipment_value}
-        df_erp = df_erp_load()
+        df_erp = df_erp_load(input_values)
         title = generate_title(input_values, "NOK (%) from each Ten Equipment per Op")
 
         df_erp['Operation'] = pd.Categorical(df_erp['Operation'], categories=OPERATIONS_LIST, ordered=True)
@@ -46,33 +46,30 @@ def register_ofa_overall_callbacks(app):
         mapping = df_erp[df_erp['Operation'] == 'Ten'].set_index('ofa')['Equipment'].to_dict()
         df_erp['Equipment'] = df_erp['ofa'].map(mapping).where(df_erp['ofa'].isin(mapping), df_erp['Equipment'])
         final_df = filter_dataframe(df_erp, input_values)
-        final_df = final_df.groupby(['Operation', 'Equipment']).agg({'NOK': 'sum', 'OK': 'sum'}).reset_index()
+        final_df = final_df.groupby(['Operation', 'Equipment'], observed=False).agg({'NOK': 'sum', 'OK': 'sum'}).reset_index()
         final_df['NOK (%)'] = 100*(final_df['NOK'] / (final_df['OK'] + final_df['NOK']))
 
         fig = go.Figure()
-        for equip, grp in final_df.groupby('Equipment'):
+        for equip, grp in final_df.groupby('Equipment', observed=True):
             fig.add_trace(go.Bar(hovertemplate='%{y:.2f}', x = grp['Operation'], y = grp['OK'], name=equip, yaxis='y1', marker_color=COLOR_DICT_EQUIPMENT[equip[:4]], opacity=0.65))
             if equip[:4] == 'Equipment1':
-                fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', x = grp['Operation'], y = grp['NOK (%)'], mode='lines+markers', name=equip + ' (%)', yaxis='y2', marker_color=COLOR_DICT_EQUIPMENT[equip[:4] + ' (%)'], visible='legendonly' ))
+                fig.add_trace(line_trace(hovertemplate='%{y:.2f}', x = grp['Operation'], y = grp['NOK (%)'], mode='lines+markers', name=equip + ' (%)', yaxis='y2', marker_color=COLOR_DICT_EQUIPMENT[equip[:4] + ' (%)'], visible='legendonly' ))
             else:
-                fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', x = grp['Operation'], y = grp['NOK (%)'], mode='lines+markers', name=equip + ' (%)', yaxis='y2', marker_color=COLOR_DICT_EQUIPMENT[equip[:4] + ' (%)'] ))
+                fig.add_trace(line_trace(hovertemplate='%{y:.2f}', x = grp['Operation'], y = grp['NOK (%)'], mode='lines+markers', name=equip + ' (%)', yaxis='y2', marker_color=COLOR_DICT_EQUIPMENT[equip[:4] + ' (%)'] ))
 
         ymax = 1.1* final_df['NOK (%)'].max()
         fig.update_xaxes(type='category', categoryorder='array', categoryarray=OPERATIONS_LIST)
         fig.update_layout(barmode='stack', height=400, title='<b>' + title + '</b>', hovermode="x unified", xaxis_title="Operations"),
         fig.update_layout(yaxis=dict(title='OK', side='left'), yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False, range=[0,ymax]), autosize=True, legend=dict(orientation="v", x=1.2, y=1))
         fig.update_xaxes(tick0=0, dtick=1, tickangle=315, title_standoff=30)
-        return fig, fig
+        return fig
 
     ###################################################################
     # 2nd Graph : NOK (%) from each Ten Equipment per Operation #
     ###################################################################
 
     @app.callback(
-        [
         Output('NOK (%) of each Type per Op', 'figure'),
-        Output('NOK (%) of each Type per Op (bis)', 'figure'),
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -89,29 +86,31 @@ def register_ofa_overall_callbacks(app):
         filtered_df = filter_dataframe(df_pp, input_values)
         filtered_df_type = filter_dataframe(df_pp_type, input_values)
 
-        filtered_df_overall = filtered_df_type.groupby(['Operation', 'Type'])[['NOK by Type']].sum().reset_index()
+        filtered_df_overall = filtered_df_type.groupby(['Operation', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         filtered_df['NOK (%)'] = 100*(filtered_df['NOK'] / (filtered_df['OK'] + filtered_df['NOK']))
 
         fig = generate_grouped_bar_plot(filtered_df_overall, 'Operation', 'Type', title, 'Operations', 'NOK by Type')
         fig.update_xaxes(type='category', categoryorder='array', categoryarray=OPERATIONS_LIST)
 
         all_weeks = OPERATIONS_LIST
-        OK_Total = filtered_df.groupby('Operation')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Operation')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Operation', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Operation', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         
         team_ratio_df = pd.DataFrame({'Operation': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operation'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operation'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, ['NOK (%) from each Ten Equipment per Op', 'NOK (%) of each Type per Op'])
 
 
 
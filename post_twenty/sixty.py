@@ -14,10 +14,13 @@ from dash.dependencies import Input, Output
 
 from erp_load import df_erp_load
 from pp_load import load_df_sixty
-from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues
+from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT
 from utils import load_operator_label, load_equipment_label, extract_type
+from rollups import load_weekly_operation
+from clientside import register_modal_graphs
+from background import background_graph
 
 def register_sixty_callbacks(app):
 
@@ -26,10 +29,7 @@ def register_sixty_callbacks(app):
     #############################################
 
     @app.callback(
-        [
         Output('60: NOK by Type per week', 'figure'),
-        Output('60: NOK by Type per week (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -41,20 +41,19 @@ def register_sixty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator, 'Equipment': selected_equipment}
         title = generate_title(input_values, "60: NOK by Type per week")
 
-        df_sixty = load_df_sixty(input_values)
-        df_sixty_type = extract_type(df_sixty)
+        df_sixty, df_sixty_type = load_weekly_operation(input_values, '60')
 
         filtered_df = filter_dataframe(df_sixty, input_values)
         filtered_df_type = filter_dataframe(df_sixty_type, input_values)
 
-        df_Week = filtered_df_type.groupby(['Week', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Week = filtered_df_type.groupby(['Week', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
         df_Week.reset_index(drop=True, inplace=True)
         fig = generate_grouped_bar_plot(df_Week, 'Week', 'Type',title, 'Weeks', 'NOK by Type')
         week_start, week_end = selected_week
         all_weeks = np.arange(week_start, week_end+1)
-        OK_Total = filtered_df.groupby('Week')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Week')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Week', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Week', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
@@ -62,22 +61,19 @@ def register_sixty_callbacks(app):
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Week': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
-        return fig, fig
+        return fig
 
     #################################################
     # 2nd Graph : 60: NOK by Type per Operator #
     #################################################
 
     @app.callback(
-        [
         Output('60: NOK by Type per Operator', 'figure'),
-        Output('60: NOK by Type per Operator (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -95,40 +91,37 @@ def register_sixty_callbacks(app):
         filtered_df = filter_dataframe(df_sixty, input_values)
         filtered_df_type = filter_dataframe(df_sixty_type, input_values)
 
-        df_Operator = filtered_df_type.groupby(['Operator', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Operator = filtered_df_type.groupby(['Operator', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         fig = generate_grouped_bar_plot(df_Operator, 'Operator', 'Type', title, 'Operators', 'NOK by Type')
 
         all_weeks = filtered_df['Operator'].unique()
-        OK_Total = filtered_df.groupby('Operator')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Operator')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Operator', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Operator', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Operator': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator'].tolist()
 
         team_ratio_df['Operator'] = pd.Categorical(team_ratio_df['Operator'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Operator', inplace=True)
 
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Operator']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
-        return fig, fig
+        return fig
 
     #####################################################
     # 3rd Graph : 60: NOK by Type per Collaborator #
     #####################################################
 
     @app.callback(
-        [
         Output('60: NOK by Type per Collaborator', 'figure'),
-        Output('60: NOK by Type per Collaborator (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -145,39 +138,36 @@ def register_sixty_callbacks(app):
         filtered_df = filter_dataframe(df_sixty, input_values)
         filtered_df_type = filter_dataframe(df_sixty_type, input_values)
 
-        df_Collaborator = filtered_df_type.groupby(['Collaborator', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Collaborator = filtered_df_type.groupby(['Collaborator', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
 
         all_weeks = filtered_df['Collaborator'].unique()
-        OK_Total = filtered_df.groupby('Collaborator')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Collaborator')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Collaborator', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Collaborator', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         team_ratio_df = pd.DataFrame({'Collaborator': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Collaborator']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Collaborator'].tolist()
 
         team_ratio_df['Collaborator'] = pd.Categorical(team_ratio_df['Collaborator'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Collaborator', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Collaborator, 'Collaborator', 'Type', title, 'Collaborators', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Collaborator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Collaborator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Collaborator']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
-        return fig, fig
+        return fig
 
     ##################################################
     # 4th Graph : 60: NOK by Type per Equipment #
     ##################################################
 
     @app.callback(
-        [
         Output('60: NOK by Type per Equipment', 'figure'),
-        Output('60: NOK by Type per Equipment (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 4', 'value'),
         Input('Week Selector 4', 'value'),
@@ -195,39 +185,36 @@ def register_sixty_callbacks(app):
         filtered_df = filter_dataframe(df_sixty, input_values)
         filtered_df_type = filter_dataframe(df_sixty_type, input_values)
 
-        df_Equipment = filtered_df_type.groupby(['Equipment', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Equipment = filtered_df_type.groupby(['Equipment', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df['Equipment'].unique()
-        OK_Total = filtered_df.groupby('Equipment')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Equipment')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Equipment', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Equipment', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Equipment': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment'].tolist()
 
         team_ratio_df['Equipment'] = pd.Categorical(team_ratio_df['Equipment'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Equipment', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Equipment, 'Equipment', 'Type', title, 'Equipments', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Equipment']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
-        return fig, fig
+        return fig
 
     #########################################
     # 5th Graph : 60: NOK per Type #
     #########################################
 
     @app.callback(
-        [
         Output('60: NOK per Type', 'figure'),
-        Output('60: NOK per Type (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 5', 'value'),
         Input('Week Selector 5', 'value'),
@@ -243,31 +230,29 @@ def register_sixty_callbacks(app):
 
         filtered_df_type = filter_dataframe(df_fifty_type, input_values)
 
-        df_Equipment = filtered_df_type.groupby('Type')['NOK by Type'].sum().reset_index()
+        df_Equipment = filtered_df_type.groupby('Type', observed=True)['NOK by Type'].sum().reset_index()
         df_Equipment = df_Equipment.sort_values(by='NOK by Type', ascending=False)  # Sort by decreasing value of NOK
 
         fig = generate_bar_plot_no_hues(df_Equipment, 'Type', title, 'Type', 'NOK by Type')
         
-        return fig, fig
+        return fig
 
     #########################################################
     # 6rd Graph : % of ofas that went to 60 #
     #########################################################
 
     @app.callback(
-        [
         Output('% of ofas that went to 60', 'figure'),
-        Output('% of ofas that went to 60 (bis)', 'figure'),
-        ],
         [
         Input('Year Dropdown 6', 'value'),
         Input('Week Selector 6', 'value'),
         Input('Equipment Dropdown 6', 'value'),
-        ]
+        ],
+        **background_graph('% of ofas that went to 60')
     )
     def update_6(selected_year, selected_week, equipment_value):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': equipment_value}
-        df_erp = df_erp_load()
+        df_erp = df_erp_load(input_values)
         title = generate_title(input_values, "% of ofas that went to 60")
         selected_week_start, selected_week_end = input_values['Week']
 
@@ -290,38 +275,46 @@ def register_sixty_callbacks(app):
 
         fig = go.Figure(data=[go.Pie(labels=['60', 'Not Sorted'], values=[size_final_df_bis, size_neg_final_df_bis], hole=.3)])
         fig.update_layout(height=400, title_text='<b>' + title + '</b>', annotations=annotations)
-        return fig, fig
+        return fig
 
     #########################################################
     # 7th Graph : % of Equipments that got sorted #
     #########################################################
 
     @app.callback(
-        [
         Output('% of Equipments that got sorted', 'figure'),
-        Output('% of Equipments that got sorted (bis)', 'figure'),
-        ],
         [
         Input('Year Dropdown 7', 'value'),
         Input('Week Selector 7', 'value'),
         Input('Equipment Dropdown 7', 'value'),
-        ]
+        ],
+        **background_graph('% of Equipments that got sorted')
     )
     def update_7(selected_year, selected_week, equipment_value):
         input_values = {'Year': selected_year, 'Week': selected_week,'Equipment': equipment_value}
         title = generate_title(input_values, "% of Equipments that got sorted")
         
-        df = df_erp_load()
+        df = df_erp_load(input_values)
         mapping = df[df['Operation'] == 'Ten'].set_index('ofa')['Equipment'].to_dict()
         df['Equipment'] = df['ofa'].map(mapping).where(df['ofa'].isin(mapping), df['Equipment'])
         df = df[(df['Operation'] == '60')]
         final_df = filter_dataframe(df, input_values)
-        final_df_group = final_df.groupby(["Equipment"]).size().reset_index(name='Counts')
+        final_df_group = final_df.groupby(["Equipment"], observed=True).size().reset_index(name='Counts')
 
         fig = go.Figure(data=[go.Pie(labels=final_df_group["Equipment"], values=final_df_group["Counts"], hole=.3)])
         fig.update_layout(height=400, title_text='<b>' + title + '</b>', annotations=[dict(text = '', x=0.5, y=0.5, font_size=20, showarrow=False)])
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [
+        '60: NOK by Type per week',
+        '60: NOK by Type per Operator',
+        '60: NOK by Type per Collaborator',
+        '60: NOK by Type per Equipment',
+        '60: NOK per Type',
+        '% of ofas that went to 60',
+        '% of Equipments that got sorted',
+    ])
 
 def sixty_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -7,16 +7,18 @@ Corresponding CSV file : pp_tracking.csv.
 
 import datetime
 
-import dash_bootstrap_components as dbc, plotly.graph_objects as go, pandas as pd, numpy as np
+import dash_bootstrap_components as dbc, pandas as pd, numpy as np
 
 from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from pp_load import load_df_twenty
-from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues
+from generate_plots import generate_grouped_bar_plot, generate_bar_plot_no_hues, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT
 from utils import load_operator_label, load_equipment_label, extract_type
+from rollups import load_weekly_operation
+from clientside import register_modal_graphs
 
 def register_twenty_callbacks(app):
 
@@ -25,10 +27,7 @@ def register_twenty_callbacks(app):
     ########################################
 
     @app.callback(
-        [
         Output('20: NOK by Type per week', 'figure'),
-        Output('20: NOK by Type per week (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -40,44 +39,40 @@ def register_twenty_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator, 'Equipment': selected_equipment}
         title = generate_title(input_values, "20: NOK by Type per week")
 
-        df_twenty = load_df_twenty(input_values)
-        df_twenty_type = extract_type(df_twenty)
+        df_twenty, df_twenty_type = load_weekly_operation(input_values, '20')
 
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Week = filtered_df_type.groupby(['Week', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Week = filtered_df_type.groupby(['Week', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
         df_Week.reset_index(drop=True, inplace=True)
 
         fig = generate_grouped_bar_plot(df_Week, 'Week', 'Type', title, 'Weeks', 'NOK by Type')
         week_start, week_end = selected_week
         all_weeks = np.arange(week_start, week_end+1)
-        OK_Total = filtered_df.groupby('Week')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Week')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Week', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Week', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Week': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
-        return fig, fig
+        return fig
 
     #######################################################
     # 2nd Graph : 20: NOK by Type per Collaborator #
     #######################################################
 
     @app.callback(
-        [
         Output('20: NOK by Type per Collaborator', 'figure'),
-        Output('20: NOK by Type per Collaborator (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -94,39 +89,36 @@ def register_twenty_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Collaborator = filtered_df_type.groupby(['Collaborator', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Collaborator = filtered_df_type.groupby(['Collaborator', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Collaborator'].unique()
-        OK_Total = filtered_df.groupby('Collaborator')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Collaborator')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Collaborator', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Collaborator', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         team_ratio_df = pd.DataFrame({'Collaborator': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Collaborator']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Collaborator'].tolist()
 
         team_ratio_df['Collaborator'] = pd.Categorical(team_ratio_df['Collaborator'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Collaborator', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Collaborator, 'Collaborator', 'Type', title, 'Collaborators', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Collaborator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Collaborator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Collaborator']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
-        return fig, fig
+        return fig
 
     ###################################################
     # 3rd Graph : 20: NOK by Type per Operator #
     ###################################################
 
     @app.callback(
-        [
         Output('20: NOK by Type per Operator', 'figure'),
-        Output('20: NOK by Type per Operator (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -143,39 +135,36 @@ def register_twenty_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Operator = filtered_df_type.groupby(['Operator', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Operator = filtered_df_type.groupby(['Operator', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Operator'].unique()
-        OK_Total = filtered_df.groupby('Operator')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Operator')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Operator', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Operator', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Operator': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator'].tolist()
 
         team_ratio_df['Operator'] = pd.Categorical(team_ratio_df['Operator'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Operator', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Operator, 'Operator', 'Type', title, 'Operators', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Operator']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
-        return fig, fig
+        return fig
 
     ####################################################
     # 4th Graph : 20: NOK by Type per Equipment #
     ####################################################
 
     @app.callback(
-        [
         Output('20: NOK by Type per Equipment', 'figure'),
-        Output('20: NOK by Type per Equipment (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 4', 'value'),
         Input('Week Selector 4', 'value'),
@@ -192,40 +181,37 @@ def register_twenty_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Equipment = filtered_df_type.groupby(['Equipment', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Equipment = filtered_df_type.groupby(['Equipment', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Equipment'].unique()
-        OK_Total = filtered_df.groupby('Equipment')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Equipment')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Equipment', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Equipment', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Equipment': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment'].tolist()
 
         team_ratio_df['Equipment'] = pd.Categorical(team_ratio_df['Equipment'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Equipment', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Equipment, 'Equipment', 'Type', title, 'Equipments', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Equipment']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
-        return fig, fig
+        return fig
 
     #######################################
     # 5th Graph : 20: NOK per Type #
     #######################################
 
     @app.callback(
-        [
         Output('20: NOK per Type', 'figure'),
-        Output('20: NOK per Type (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 5', 'value'),
         Input('Week Selector 5', 'value'),
@@ -241,12 +227,20 @@ def register_twenty_callbacks(app):
 
         filtered_df_type = filter_dataframe(df_fifty_type, input_values)
 
-        df_Equipment = filtered_df_type.groupby('Type')['NOK by Type'].sum().reset_index()
+        df_Equipment = filtered_df_type.groupby('Type', observed=True)['NOK by Type'].sum().reset_index()
         df_Equipment = df_Equipment.sort_values(by='NOK by Type', ascending=False)  # Sort by decreasing value of NOK
 
         fig = generate_bar_plot_no_hues(df_Equipment, 'Type', title, 'Type', 'NOK by Type')
         
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [
+        '20: NOK by Type per week',
+        '20: NOK by Type per Collaborator',
+        '20: NOK by Type per Operator',
+        '20: NOK by Type per Equipment',
+        '20: NOK per Type',
+    ])
 
 def twenty_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -18,6 +18,8 @@ from generate_plots import generate_custom_bar_plot
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT
 from utils import load_operator_label, load_equipment_label, extract_type
+from rollups import load_weekly_operation
+from clientside import register_modal_graphs
 
 FIRST_GRAPH = "0: NOK by Type per week"
 SECOND_GRAPH = "0: NOK by Type per Collaborator"
@@ -32,7 +34,7 @@ def create_graph(input_values, title_name, hue):
 
     filtered_df_type = filter_dataframe(df_zero_type, input_values)
 
-    df_Operator = filtered_df_type.groupby([hue, 'Type'])[['NOK by Type']].sum().reset_index()
+    df_Operator = filtered_df_type.groupby([hue, 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
 
     fig = generate_custom_bar_plot(df_Operator, hue, 'Type', title, hue + 's', 'NOK by Type')
     return fig 
@@ -44,10 +46,7 @@ def register_zero_callbacks(app):
     #######################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -59,28 +58,24 @@ def register_zero_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator, 'Equipment': selected_equipment}
         title = generate_title(input_values, FIRST_GRAPH)
 
-        df_zero = load_df_zero(input_values)
-        df_zero_type = extract_type(df_zero)
+        _, df_zero_type = load_weekly_operation(input_values, '0')
 
         filtered_df_type = filter_dataframe(df_zero_type, input_values)
 
-        df_Week = filtered_df_type.groupby(['Week', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Week = filtered_df_type.groupby(['Week', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
         df_Week.reset_index(drop=True, inplace=True)
 
         fig = generate_custom_bar_plot(df_Week, 'Week', 'Type', title, 'Weeks', 'NOK by Type')
 
-        return fig, fig
+        return fig
 
     ###############################################
     # 2nd Graph : 0: NOK by Type per Collaborator #
     ###############################################
 
     @app.callback(
-        [
         Output(SECOND_GRAPH, 'figure'),
-        Output(SECOND_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -91,17 +86,14 @@ def register_zero_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': selected_equipment}
         fig = create_graph(input_values, SECOND_GRAPH, 'Collaborator')
 
-        return fig, fig
+        return fig
 
     ###########################################
     # 3rd Graph : 0: NOK by Type per Operator #
     ###########################################
 
     @app.callback(
-        [
         Output(THIRD_GRAPH, 'figure'),
-        Output(THIRD_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -112,17 +104,14 @@ def register_zero_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Equipment': selected_equipment}
         fig = create_graph(input_values, THIRD_GRAPH, 'Operator')
 
-        return fig, fig
+        return fig
 
     ############################################
     # 4th Graph : 0: NOK by Type per Equipment #
     ############################################
 
     @app.callback(
-        [
         Output(FOURTH_GRAPH, 'figure'),
-        Output(FOURTH_GRAPH + ' (bis)', 'figure')
-        ],
         [
         Input('Year Dropdown 4', 'value'),
         Input('Week Selector 4', 'value'),
@@ -133,7 +122,9 @@ def register_zero_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': selected_operator}
         fig = create_graph(input_values, FOURTH_GRAPH, 'Equipment')
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH, SECOND_GRAPH, THIRD_GRAPH, FOURTH_GRAPH])
     
 def zero_layout(operator_show):
     current_year = datetime.datetime.now().year
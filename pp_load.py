@@ -1,111 +1,115 @@
-import ast, sqlite3
-
-import pandas as pd, numpy as np
+import pandas as pd
 
 from pathlib import Path
 from datetime import datetime
 
 from dicts import SHIFT_DICT, OPERATION_DICT_PP
 
-from utils import fix_operator, assign_team, assign_weekday, returns_defaults_dict
-from smc_load import load_df_equip_by_ofa
+from utils import fix_operators
+from features import compute_team, compute_weekday, compute_year, compute_production_week, compact_dtypes
 from filters import apply_filter_query
+from ofa_index import ofa_index_built, load_ofa_index
+from cache import DataFrameCache, cached_loader
+from db import get_connection
 
 current_year = datetime.now().year
 
 PP_COLS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
 PP_NAME = ["ofa", "Date", "Operator", "Collaborator", "Shift", "Operation", "OK", "NOK", "Type", "Comments"]
 
+PP_CATEGORIES = ['Operator', 'Collaborator', 'Shift', 'Operation', 'Weekday', 'Equipment', 'Type', 'ofa'] # Few distinct values, stored as category
+PP_INTEGERS = ['OK', 'NOK', 'Week', 'Year', 'Team'] # Stored as int32
+
 PP_TRACKING_PATH = Path("C:/Users/a22006/Desktop/Dashboard_hmsa/pp_tracking.csv") # Path("/Users/leondeligny/Desktop/Master/Dashboard_hmsa/pp_tracking.csv") # PP_TRACKING_PATH = Path("Z:\\data\\pp_tracking.csv")
 
-def load_pp_data(input_values):
-    # Connect to the PostgreSQL database
-    conn = sqlite3.connect('database1.db')
-    query = """
-        select ofa, dte, uusr, usr, shift, ope, qty_ok, qty_ko, defaults, comments
-        from pp_tracking 
-    """
+PP_QUERY = """
+    select ofa, dte, uusr, usr, shift, ope, qty_ok, qty_ko, defaults, comments, NULL as equipment
+    from pp_tracking 
+"""
+
+# Equipment of the ofas run on a single equipment joined from the ofa_equipment index (see ofa_index.py),
+# the filters of apply_filter_query only use pp_tracking columns
+PP_INDEXED_QUERY = """
+    select p.ofa, p.dte, p.uusr, p.usr, p.shift, p.ope, p.qty_ok, p.qty_ko, p.defaults, p.comments, e.equipment
+    from pp_tracking p left join ofa_equipment e on e.ofa = p.ofa and e.equipment_count = 1 
+"""
+
+PP_CACHE = DataFrameCache('load_pp_data', 'database1.db')
+
+@cached_loader(PP_CACHE)
+def load_pp_data(input_values, operations=None):
+    # Read-only connection of this thread, kept open between calls (see db.py)
+    conn = get_connection('database1.db')
+    indexed = ofa_index_built(conn.cursor())
+    query = PP_INDEXED_QUERY if indexed else PP_QUERY
 
-    filtered_query = apply_filter_query(query, input_values)
+    filtered_query, params = apply_filter_query(query, input_values, operations)
 
-    # Execute the query and load data into a DataFrame
-    df = pd.read_sql_query(filtered_query, conn) # df = pd.read_csv(PP_TRACKING_PATH, delimiter=';', usecols=PP_COLS, names=PP_NAME, skiprows=1)
+    # Execute the query and load data into a DataFrame, dates parsed once (the WHERE clause on dte already drops missing dates)
+    df = pd.read_sql_query(filtered_query, conn, params=params, parse_dates=['dte']) # df = pd.read_csv(PP_TRACKING_PATH, delimiter=';', usecols=PP_COLS, names=PP_NAME, skiprows=1)
 
-    df.columns = PP_NAME
-    
-    # Close the connection
-    conn.close()
+    df.columns = PP_NAME + ['Equipment']
+    equipment = df.pop('Equipment')
 
-    df = df[df['Date'].notna()]
-    df.reset_index(drop=True, inplace=True)
-    df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
-    df['Year'] = (df['Date'].dt.year).astype(int)
+    df['Date'] = df['Date'].dt.normalize()
+    df['Year'] = compute_year(df)
     df['Type'] = df['Type'].fillna('')
     df['Comments'] = df['Comments'].fillna('')
-    df['Operator'] = df['Operator'].fillna('NA')
-    df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
+    df['Operator'] = fix_operators(df['Operator'].fillna('NA'))
     #df = df.groupby(["ofa", "Date", "Operator", "Collaborator", "Shift", "Operation"]).agg({'OK': 'sum','NOK': 'sum','Type': ' '.join,'Comments': ' '.join}).reset_index()
-    operators_set = set(df['Operator'])
-    df['Operator'] = df['Operator'].apply(lambda x: fix_operator(x, operators_set))
-    df['Week'] = np.where((df['Date'].dt.dayofweek == 6) & (df['Shift'] != 2), (df['Date'] + pd.DateOffset(days=-1)).dt.to_period('W-SAT').dt.week,df['Date'].dt.to_period('W-SAT').dt.week)
+    df['Week'] = compute_production_week(df)
 
-    df['Team'] = df.apply(assign_team, axis=1)
+    df['Team'] = compute_team(df)
     df['Shift'] = df['Shift'].map(SHIFT_DICT)
-    df['Operation'] = df['Operation'].map(OPERATION_DICT_PP)
-    df['Weekday'] = df.apply(assign_weekday, axis=1)
+    df['Operation'] = pd.to_numeric(df['Operation'], errors='coerce').map(OPERATION_DICT_PP) # ope is stored as TEXT
+    df['Weekday'] = compute_weekday(df)
     df['Week'] = df['Week'].dropna().astype(int)
-    df_equip_by_ofa = load_df_equip_by_ofa()
-    df_equip_by_ofa['Equipment List'] = df_equip_by_ofa['Equipment List'].apply(lambda x: ', '.join(x))
-    df['Equipment'] = df['ofa'].map(df_equip_by_ofa.set_index('ofa')['Equipment List'])
-    df['Equipment'] = df['Equipment'].astype(str)
-    week_options = df["Week"].astype(int).unique().tolist()
-    df = df.sort_values(by=['Date', 'Shift'], ascending=[False, False])
-
-    def replace_keys(d, mapping):
-        return {mapping.get(k, k): v for k, v in d.items()}
-    
-    DEFAULTS_DICT = returns_defaults_dict()
-
-    df['Type'] = df['Type'].apply(lambda x: replace_keys(ast.literal_eval(x), DEFAULTS_DICT) if isinstance(x, str) and x else x)    
-    
+    if not indexed: # ofa_equipment not built yet by create_db.py, the index is computed once per version of database1.db
+        df_index = load_ofa_index()
+        equipment = df['ofa'].map(df_index[df_index['Equipment Count'] == 1].set_index('ofa')['Equipment'])
+    df['Equipment'] = equipment.where(equipment.notna()).astype(str) # 'nan' for the ofas without a single equipment
+    compact_dtypes(df, PP_CATEGORIES, PP_INTEGERS)
+    week_options = df["Week"].unique().tolist()
+    df.sort_values(by=['Date', 'Shift'], ascending=[False, False], inplace=True)
+
     return df, week_options
 
+def load_pp_operations(input_values, operations):
+    """
+    Args:
+        input_values (dict): filter values (Year, Week, Shift are applied in SQL)
+        operations (iterable): operations to load, e.g. ['20', '100']
+    Returns:
+        df_by_operation (dict): dataframe of each requested operation, all loaded in one query
+    """
+    operations = tuple(sorted(set(operations), key=int))
+    df, _ = load_pp_data(input_values, operations)
+    df_by_operation = dict(tuple(df.groupby('Operation', sort=False, observed=True)))
+    return {operation: df_by_operation.get(operation, df.iloc[0:0]) for operation in operations}
+
+def load_df_operation(input_values, operation):
+    return load_pp_operations(input_values, [operation])[operation]
+
 def load_df_zero(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='0']
-    return df
+    return load_df_operation(input_values, '0')
 
 def load_df_twenty(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='20']
-    return df
+    return load_df_operation(input_values, '20')
 
 def load_df_fifty(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='50']
-    return df
+    return load_df_operation(input_values, '50')
 
 def load_df_sixty(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='60']
-    return df
+    return load_df_operation(input_values, '60')
 
 def load_df_seventy_one(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='71']
-    return df
+    return load_df_operation(input_values, '71')
 
 def load_df_seventy_two(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='72']
-    return df
+    return load_df_operation(input_values, '72')
 
 def load_df_hundred(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='100']
-    return df
+    return load_df_operation(input_values, '100')
 
 def load_df_hundred_one(input_values):
-    df, _ = load_pp_data(input_values)
-    df = df[df['Operation']=='101']
-    return df
\ No newline at end of file
+    return load_df_operation(input_values, '101')
@@ -9,10 +9,11 @@ from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT, EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENTS_PER_OPERATOR_LABEL_LIST, SHIFT_LABEL_LIST, WEEKDAY_LABEL_LIST
 from utils import load_operator_label, load_equipment_label, extract_type_smc
+from clientside import register_modal_graphs
 
 FIRST_GRAPH = "Ten: NOK by Type per Equipment"
 
@@ -23,10 +24,7 @@ def register_equipment_callbacks(app):
     ##############################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -47,29 +45,31 @@ def register_equipment_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Collaborator = filtered_df_type.groupby(['Equipment', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Collaborator = filtered_df_type.groupby(['Equipment', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Equipment'].unique()
-        OK_Total = filtered_df.groupby('Equipment')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Equipment')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Equipment', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Equipment', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         team_ratio_df = pd.DataFrame({'Equipment': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Equipment'].tolist()
 
         team_ratio_df['Equipment'] = pd.Categorical(team_ratio_df['Equipment'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Equipment', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Collaborator, 'Equipment', 'Type', title, 'Equipments', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Equipment'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Equipment']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
     
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH])
 
 def equipment_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -4,26 +4,34 @@ Module related to pre-Ten > Mismatches.
 
 import datetime
 
-import pandas as pd
-
 from dash import html
 from dash import dash_table
+from dash.dependencies import Input, Output
+
+from ofa_index import MISMATCH_COLUMNS, load_mismatch_page
 
-from smc_load import load_df_ofa_mismatch
+PAGE_SIZE = 25 # Rows of the table fetched at once
 
 def mismatches():
-    df_ofa_mismatch = load_df_ofa_mismatch()
     current_year = datetime.datetime.now().year
 
+    # Paged, sorted and filtered in SQL by update_mismatches, one page at a time
     return html.Div(children=[
         dash_table.DataTable(
             id='table',
-            columns=[{"name": i, "id": i} for i in df_ofa_mismatch.columns],
-            data=df_ofa_mismatch.to_dict('records'),
+            columns=[{"name": i, "id": i} for i in MISMATCH_COLUMNS],
+            page_current=0,
+            page_size=PAGE_SIZE,
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='multi',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
             style_data={'whiteSpace': 'normal'},
             style_cell={'height': 'auto'},
             style_cell_conditional=[
-                {'if': {'column_id': c}, 'backgroundColor': 'white', 'color': 'black'} for c in df_ofa_mismatch.columns],
+                {'if': {'column_id': c}, 'backgroundColor': 'white', 'color': 'black'} for c in MISMATCH_COLUMNS],
             style_data_conditional=[
                 {'if': {'row_index': 'odd'},'backgroundColor': 'white'},
                 {'if': {'filter_query': '{{Year}} = {}'.format(current_year)}, 'backgroundColor': 'red', 'color': 'white'},
@@ -35,3 +43,20 @@ def mismatches():
                 },
             ),
         ])
+
+def register_mismatches_callbacks(app):
+    @app.callback(
+        [
+        Output('table', 'data'),
+        Output('table', 'page_count'),
+        ],
+        [
+        Input('table', 'page_current'),
+        Input('table', 'page_size'),
+        Input('table', 'sort_by'),
+        Input('table', 'filter_query'),
+        ]
+    )
+    def update_mismatches(page_current, page_size, sort_by, filter_query):
+        df_page, page_count = load_mismatch_page(page_current or 0, page_size or PAGE_SIZE, sort_by or [], filter_query)
+        return df_page.to_dict('records'), page_count
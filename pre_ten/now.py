@@ -4,16 +4,18 @@ Module related to the different graphs in pre-Ten > Now.
 
 import calendar, datetime
 
-import dash_bootstrap_components as dbc, plotly.graph_objects as go, pandas as pd, numpy as np
+import dash_bootstrap_components as dbc, pandas as pd, numpy as np
 
 from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT, EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENTS_PER_OPERATOR_LABEL_LIST, WEEKDAY_LABEL_LIST, SHIFT_LABEL_LIST
 from utils import load_operator_label, load_equipment_label, extract_type_smc
+from rollups import load_weekly_smc
+from clientside import register_modal_graphs
 
 SECOND_GRAPH = 'Ten: NOK by Type per week Now'
 THIRD_GRAPH = 'Ten: NOK by Type per Weekday Now'
@@ -21,28 +23,27 @@ THIRD_GRAPH = 'Ten: NOK by Type per Weekday Now'
 def create_graph_week(input_values, number_graph, feature):
     title = generate_title(input_values, number_graph)
     
-    df_twenty = load_df_smc(input_values)
-    df_twenty_type = extract_type_smc(df_twenty)
+    df_twenty, df_twenty_type = load_weekly_smc(input_values)
 
     filtered_df = filter_dataframe(df_twenty, input_values)
     filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-    df_Week = filtered_df_type.groupby([feature, 'Type'])[['NOK by Type']].sum().reset_index()
+    df_Week = filtered_df_type.groupby([feature, 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
     df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
     df_Week.reset_index(drop=True, inplace=True)
 
     fig = generate_grouped_bar_plot(df_Week, feature, 'Type', title, feature+'s', 'NOK by Type')
     week_start, week_end = input_values['Week'] # week_start, week_end = selected_week
     all_weeks = np.arange(week_start, week_end+1)
-    OK_Total = filtered_df.groupby(feature)['OK'].sum()
-    NOK_Total = filtered_df.groupby(feature)['NOK'].sum()
+    OK_Total = filtered_df.groupby(feature, observed=True)['OK'].sum()
+    NOK_Total = filtered_df.groupby(feature, observed=True)['NOK'].sum()
 
     OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
     NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
     NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
     team_ratio_df = pd.DataFrame({feature: all_weeks, 'NOK (%)': NOK_Ratio.values})
-    fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[feature], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+    fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[feature], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
     if NOK_Ratio.size > 0:
         ymax = 1.1* NOK_Ratio.values.max()
         fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
@@ -59,22 +60,22 @@ def create_graph_rest(input_values, number_graph, feature):
     filtered_df = filter_dataframe(df_twenty, input_values)
     filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-    df_Collaborator = filtered_df_type.groupby([feature, 'Type'])[['NOK by Type']].sum().reset_index()
+    df_Collaborator = filtered_df_type.groupby([feature, 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
     all_weeks = filtered_df_type[feature].unique()
-    OK_Total = filtered_df.groupby(feature)['OK'].sum()
-    NOK_Total = filtered_df.groupby(feature)['NOK'].sum()
+    OK_Total = filtered_df.groupby(feature, observed=True)['OK'].sum()
+    NOK_Total = filtered_df.groupby(feature, observed=True)['NOK'].sum()
 
     OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
     NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
     NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
     team_ratio_df = pd.DataFrame({feature: all_weeks, 'NOK (%)': NOK_Ratio.values})
-    ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)[feature]
+    ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)[feature].tolist()
 
     team_ratio_df[feature] = pd.Categorical(team_ratio_df[feature], categories=ofa_categories_ordered, ordered=True)
     team_ratio_df.sort_values(by=feature, inplace=True)
 
     fig = generate_grouped_bar_plot(df_Collaborator, feature, 'Type', title, 'Weekdays', 'NOK by Type')
-    fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[feature], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+    fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df[feature], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
     fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df[feature]})
     if NOK_Ratio.size > 0:
         ymax = 1.1* NOK_Ratio.values.max()
@@ -92,10 +93,7 @@ def register_now_callbacks(app):
     #############################################
 
     @app.callback(
-        [
         Output(SECOND_GRAPH, 'figure'),
-        Output(SECOND_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -110,17 +108,14 @@ def register_now_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': operator_value,'Equipment': equipment_value, 'Shift': shift_value, 'Weekday': weekday_value, 'Equipments per Operator': equipment_per_operator}
         fig = create_graph_week(input_values, SECOND_GRAPH, 'Week')
 
-        return fig, fig
+        return fig
 
     ################################################
     # 3rd Graph : Ten: NOK by Type per Weekday Now #
     ################################################
 
     @app.callback(
-        [
         Output(THIRD_GRAPH, 'figure'),
-        Output(THIRD_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 3', 'value'),
         Input('Week Selector 3', 'value'),
@@ -135,7 +130,9 @@ def register_now_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': operator_value,'Equipment': equipment_value, 'Shift': shift_value, 'Weekday': weekday_value, 'Equipments per Operator': equipment_per_operator}
         fig = create_graph_rest(input_values, THIRD_GRAPH, 'Weekday')
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [SECOND_GRAPH, THIRD_GRAPH])
 
 def now_layout(operator_show):
     current_year = datetime.datetime.now().year
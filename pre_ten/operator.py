@@ -4,16 +4,20 @@ Module related to the different graphs in pre-Ten > Operator.
 
 import calendar, datetime
 
-import dash_bootstrap_components as dbc, plotly.graph_objects as go, plotly.express as px, numpy as np, pandas as pd
+import dash_bootstrap_components as dbc, plotly.graph_objects as go, numpy as np, pandas as pd
 
 from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEK_DICT, EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENTS_PER_OPERATOR_LABEL_LIST, SHIFT_LABEL_LIST, WEEKDAY_LABEL_LIST
 from utils import load_operator_label, load_equipment_label, extract_type_smc
+from clientside import register_modal_graphs
+from startup import lazy_import
+
+px = lazy_import('plotly.express') # Only used by the scatter plot (its trendline imports statsmodels)
 
 FIRST_GRAPH = "Ten: NOK by Type per Operator"
 
@@ -24,10 +28,7 @@ def register_operator_callbacks(app):
     #############################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -48,29 +49,31 @@ def register_operator_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Collaborator = filtered_df_type.groupby(['Operator', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Collaborator = filtered_df_type.groupby(['Operator', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Operator'].unique()
-        OK_Total = filtered_df.groupby('Operator')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Operator')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Operator', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Operator', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         team_ratio_df = pd.DataFrame({'Operator': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Operator'].tolist()
 
         team_ratio_df['Operator'] = pd.Categorical(team_ratio_df['Operator'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Operator', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Collaborator, 'Operator', 'Type', title, 'Operators', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Operator'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Operator']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH])
 
 def operator_layout(operator_show):
     current_year = datetime.datetime.now().year
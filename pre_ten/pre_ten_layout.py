@@ -7,7 +7,7 @@ import dash_bootstrap_components as dbc
 from dash import html
 from dash.dependencies import Input, Output
 
-from pre_ten.mismatches import mismatches
+from pre_ten.mismatches import register_mismatches_callbacks, mismatches
 from pre_ten.now import register_now_callbacks, now_layout
 from pre_ten.week import register_week_callbacks, week_layout
 from pre_ten.operator import register_operator_callbacks, operator_layout
@@ -51,6 +51,7 @@ def pre_ten_layout(operator_show):
 
 def register_pre_ten_layout_callbacks(app):
     
+    register_mismatches_callbacks(app)
     register_now_callbacks(app)
     #register_cons_callbacks(app)
     register_week_callbacks(app)
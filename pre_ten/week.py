@@ -11,10 +11,12 @@ from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc, extract_cons_tool
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, COLOR_DICT_EQUIPMENT, TEAM_COLOR, WEEK_DICT, EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENTS_PER_OPERATOR_LABEL_LIST, SHIFT_LABEL_LIST, WEEKDAY_LABEL_LIST
-from utils import load_operator_label, load_equipment_label, extract_type_smc
+from utils import load_operator_label, load_equipment_label
+from rollups import load_weekly_smc
+from clientside import register_modal_graphs
 
 FIRST_GRAPH = "Ten: NOK by Type per week"
 
@@ -25,10 +27,7 @@ def register_week_callbacks(app):
     #########################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Dropdown 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -43,34 +42,35 @@ def register_week_callbacks(app):
         input_values = {'Year': selected_year, 'Week': selected_week, 'Operator': operator_value,'Equipment': equipment_value, 'Shift': shift_value, 'Weekday': weekday_value, 'Equipments per Operator': equipment_per_operator}
         title = generate_title(input_values, FIRST_GRAPH)
 
-        df_twenty = load_df_smc(input_values)
-        df_twenty_type = extract_type_smc(df_twenty)
+        df_twenty, df_twenty_type = load_weekly_smc(input_values)
 
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Week = filtered_df_type.groupby(['Week', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Week = filtered_df_type.groupby(['Week', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         df_Week.sort_values(by=['Type'], inplace=True, ascending=False)
         df_Week.reset_index(drop=True, inplace=True)
 
         fig = generate_grouped_bar_plot(df_Week, 'Week', 'Type', title, 'Weeks', 'NOK by Type')
         week_start, week_end = selected_week
         all_weeks = np.arange(week_start, week_end+1)
-        OK_Total = filtered_df.groupby('Week')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Week')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Week', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Week', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
 
         team_ratio_df = pd.DataFrame({'Week': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Week'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
             fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', range=[0, ymax], overlaying='y', showgrid=False))
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH])
 
 def week_layout(operator_show):
     current_year = datetime.datetime.now().year
@@ -10,10 +10,11 @@ from dash import html, dcc
 from dash.dependencies import Input, Output
 
 from smc_load import load_df_smc
-from generate_plots import generate_grouped_bar_plot
+from generate_plots import generate_grouped_bar_plot, line_trace
 from filters import filter_dataframe, generate_title
 from dicts import CustomCard, WEEKDAY_DICT, WEEK_DICT, EQUIPMENTS_PER_OPERATOR_LIST, EQUIPMENTS_PER_OPERATOR_LABEL_LIST, SHIFT_LABEL_LIST, WEEKDAY_LABEL_LIST
 from utils import load_operator_label, load_equipment_label, extract_type_smc
+from clientside import register_modal_graphs
 
 FIRST_GRAPH = "Ten: NOK by Type per Weekday"
 SECOND_GRAPH = "Ten: NOK (%) Boxplot per Weekday"
@@ -25,10 +26,7 @@ def register_weekday_callbacks(app):
     ############################################
 
     @app.callback(
-        [
         Output(FIRST_GRAPH, 'figure'),
-        Output(FIRST_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 1', 'value'),
         Input('Week Selector 1', 'value'),
@@ -49,22 +47,22 @@ def register_weekday_callbacks(app):
         filtered_df = filter_dataframe(df_twenty, input_values)
         filtered_df_type = filter_dataframe(df_twenty_type, input_values)
 
-        df_Collaborator = filtered_df_type.groupby(['Weekday', 'Type'])[['NOK by Type']].sum().reset_index()
+        df_Collaborator = filtered_df_type.groupby(['Weekday', 'Type'], observed=True)[['NOK by Type']].sum().reset_index()
         all_weeks = filtered_df_type['Weekday'].unique()
-        OK_Total = filtered_df.groupby('Weekday')['OK'].sum()
-        NOK_Total = filtered_df.groupby('Weekday')['NOK'].sum()
+        OK_Total = filtered_df.groupby('Weekday', observed=True)['OK'].sum()
+        NOK_Total = filtered_df.groupby('Weekday', observed=True)['NOK'].sum()
 
         OK_Total = OK_Total.reindex(all_weeks, fill_value=1)
         NOK_Total = NOK_Total.reindex(all_weeks, fill_value=0)
         NOK_Ratio = (NOK_Total / (OK_Total + NOK_Total)) * 100
         team_ratio_df = pd.DataFrame({'Weekday': all_weeks, 'NOK (%)': NOK_Ratio.values})
-        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Weekday']
+        ofa_categories_ordered = team_ratio_df.sort_values('NOK (%)', ascending=False)['Weekday'].tolist()
 
         team_ratio_df['Weekday'] = pd.Categorical(team_ratio_df['Weekday'], categories=ofa_categories_ordered, ordered=True)
         team_ratio_df.sort_values(by='Weekday', inplace=True)
 
         fig = generate_grouped_bar_plot(df_Collaborator, 'Weekday', 'Type', title, 'Weekdays', 'NOK by Type')
-        fig.add_trace(go.Scatter(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Weekday'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
+        fig.add_trace(line_trace(hovertemplate='%{y:.2f}', mode="markers+lines",  x=team_ratio_df['Weekday'], y=team_ratio_df['NOK (%)'], name='NOK (%)', yaxis='y2', line=dict(color='black')))
         fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray':team_ratio_df['Weekday']})
         if NOK_Ratio.size > 0:
             ymax = 1.1* NOK_Ratio.values.max()
@@ -72,17 +70,14 @@ def register_weekday_callbacks(app):
         else: fig.update_layout(yaxis2=dict(title='NOK (%)', side='right', overlaying='y', showgrid=False))
 
 
-        return fig, fig
+        return fig
 
     ################################################
     # 2nd Graph : Ten: NOK (%) Boxplot per Weekday #
     ################################################
 
     @app.callback(
-        [
         Output(SECOND_GRAPH, 'figure'),
-        Output(SECOND_GRAPH + ' (bis)', 'figure'),
-        ],
         [
         Input('Year Selector 2', 'value'),
         Input('Week Selector 2', 'value'),
@@ -100,7 +95,7 @@ def register_weekday_callbacks(app):
         title = generate_title(input_values, SECOND_GRAPH)
 
         filtered_df[f'NOK (%)'] = (filtered_df[f'NOK'] / (filtered_df['OK'] + filtered_df['NOK'])) * 100
-        filtered_df['Weekday Rank'] = filtered_df['Weekday'].map(WEEKDAY_DICT)
+        filtered_df['Weekday Rank'] = filtered_df['Weekday'].map(WEEKDAY_DICT).astype(float) # Weekday is a category, whose map keeps the order of the names
         filtered_df.sort_values('Weekday Rank', inplace=True)
         del filtered_df['Weekday Rank']
         fig = go.Figure()
@@ -109,7 +104,9 @@ def register_weekday_callbacks(app):
         fig.update_xaxes(title_text='Weekday', tickangle=315)
         fig.update_yaxes(title_text=f'NOK (%)')
 
-        return fig, fig
+        return fig
+
+    register_modal_graphs(app, [FIRST_GRAPH, SECOND_GRAPH])
 
 def weekday_layout(operator_show):
     current_year = datetime.datetime.now().year
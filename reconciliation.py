@@ -0,0 +1,172 @@
+"""
+Module related to the NOK reconciliation table of database1.db : the tracking rows whose declared NOK does not add up.
+
+Every row of uu_tracking and pp_tracking declares its NOK (qty_ko) and breaks it down in up to three ways :
+    - buckets : d0 to d6 (uu_tracking only),
+    - defaults : NOK of each defect in the defaults JSON, when the row has some,
+    - cons : #CONS-00<n>#<C|O|U>#<NOK> codes of the comments (see smc_load.load_df_smc_cons), plus the A (d0) and R (d3)
+      buckets for uu_tracking, the rule of the former smc_load.load_df_smc_cons_mismatch. For pp_tracking, only the rows
+      with codes are checked.
+nok_reconciliation holds the rows for which one of them differs from qty_ko, with every sum and a flag per breakdown.
+create_db.py refreshes it in the ingestion transaction, for the (year, dte_week) of the written rows only, as the rollups.
+"""
+
+import pandas as pd, numpy as np
+
+from dicts import SHIFT_DICT, INV_SHIFT_DICT
+from defaults import explode_defaults
+from rollups import touched_weeks, all_weeks, load_raw_rows
+from filters import date_bounds, apply_filter_query
+from cache import DataFrameCache, cached_loader
+from db import get_connection, table_exists
+
+RECONCILIATION_SOURCES = ['uu_tracking', 'pp_tracking']
+
+BUCKETS = ['d0', 'd1', 'd2', 'd3', 'd4', 'd5', 'd6']
+
+CONS_PATTERN = r'#CONS-00(?P<cons>\d+)#(?P<kind>[COU])#(?P<nok>\d+)'
+
+# Rows of each source with their natural key as row_key, the buckets are NULL for pp_tracking.
+RECONCILIATION_QUERIES = {
+    'uu_tracking': f"select CAST(id AS TEXT) as row_key, dte, shift, usr as operator, pdc as equipment, ofa, NULL as operation, qty_ko, {', '.join(BUCKETS)}, defaults, comments from uu_tracking ",
+    'pp_tracking': f"""select {" || '|' || ".join(f"coalesce({column}, '')" for column in ['ofa', 'dte', 'uusr', 'usr', 'shift', 'ope'])} as row_key,
+                      dte, shift, uusr as operator, NULL as equipment, ofa, ope as operation, qty_ko, {', '.join(f'NULL as {bucket}' for bucket in BUCKETS)}, defaults, comments from pp_tracking """,
+}
+
+RECONCILIATION_COLUMNS = ['row_key', 'dte', 'shift', 'operator', 'equipment', 'ofa', 'operation', 'nok', 'buckets_nok', 'defaults_nok', 'cons_nok', 'buckets_mismatch', 'defaults_mismatch', 'cons_mismatch']
+
+RECONCILIATION_NAME = ['Row', 'Date', 'Shift', 'Operator', 'Equipment', 'ofa', 'Operation', 'NOK', 'Buckets NOK', 'Defaults NOK', 'CONS NOK', 'Buckets Mismatch', 'Defaults Mismatch', 'CONS Mismatch']
+
+RECONCILIATION_CACHE = DataFrameCache('load_reconciliation', 'database1.db')
+
+##############################
+# Reconciliation             #
+##############################
+
+def defaults_nok(defaults):
+    """
+    Args:
+        defaults (pd.Series): raw defaults JSON column, with a RangeIndex
+    Returns:
+        nok (np.ndarray): sum of the NOK of each row's defects
+        declared (np.ndarray): the row has at least one defect
+    """
+    df_long = explode_defaults(defaults)
+    nok = pd.to_numeric(pd.Series(df_long['NOK by Type'].values), errors='coerce').fillna(0).values
+    return np.bincount(df_long['row_id'], weights=nok, minlength=len(defaults)).astype(np.int64), np.bincount(df_long['row_id'], minlength=len(defaults)) > 0
+
+def cons_nok(comments):
+    """
+    Args:
+        comments (pd.Series): comments column, with a RangeIndex
+    Returns:
+        nok (np.ndarray): sum of the NOK of each row's #CONS codes, the last one of a (cons, kind) counting as load_df_smc_cons does
+        declared (np.ndarray): the row has at least one code
+    """
+    comments = comments.fillna('').astype(str)
+    with_codes = comments[comments.str.contains('#CONS', regex=False)]
+    codes = with_codes.str.extractall(CONS_PATTERN)
+    codes['row'] = codes.index.get_level_values(0)
+    codes = codes.drop_duplicates(['row', 'cons', 'kind'], keep='last')
+    return np.bincount(codes['row'], weights=codes['nok'].astype(np.int64), minlength=len(comments)).astype(np.int64), np.bincount(codes['row'], minlength=len(comments)) > 0
+
+def compute_reconciliation(df, source):
+    """
+    Args:
+        df (pd.DataFrame): rows of RECONCILIATION_QUERIES
+        source (str): 'uu_tracking' or 'pp_tracking'
+    Returns:
+        df_mismatch (pd.DataFrame): rows of nok_reconciliation (RECONCILIATION_COLUMNS), the rows with at least one mismatch
+    """
+    df = df.reset_index(drop=True)
+    nok = df['qty_ko'].fillna(0).astype(np.int64).values
+    buckets = df[BUCKETS].apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.int64)
+    with_buckets = source == 'uu_tracking'
+
+    df_nok, with_defaults = defaults_nok(df['defaults'])
+    df_cons, with_codes = cons_nok(df['comments'])
+    if with_buckets:
+        df_cons = df_cons + buckets['d0'].values + buckets['d3'].values # A and R
+        with_codes = np.ones(len(df), dtype=bool)
+
+    df['nok'] = nok
+    df['buckets_nok'] = buckets.sum(axis=1).values if with_buckets else np.nan
+    df['defaults_nok'] = np.where(with_defaults, df_nok, np.nan)
+    df['cons_nok'] = np.where(with_codes, df_cons, np.nan)
+    df['buckets_mismatch'] = (with_buckets & (df['buckets_nok'] != nok)).astype(int)
+    df['defaults_mismatch'] = (with_defaults & (df_nok != nok)).astype(int)
+    df['cons_mismatch'] = (with_codes & (df_cons != nok)).astype(int)
+
+    mismatch = df[['buckets_mismatch', 'defaults_mismatch', 'cons_mismatch']].any(axis=1)
+    return df.loc[mismatch, RECONCILIATION_COLUMNS].reset_index(drop=True)
+
+##############################
+# Reconciliation maintenance #
+##############################
+
+def create_reconciliation_tables(cursor):
+    cursor.execute('CREATE TABLE IF NOT EXISTS nok_reconciliation (source TEXT, row_key TEXT, dte TEXT, shift INTEGER, operator TEXT, equipment TEXT, ofa TEXT, operation TEXT, nok INTEGER, buckets_nok INTEGER, defaults_nok INTEGER, cons_nok INTEGER, buckets_mismatch INTEGER, defaults_mismatch INTEGER, cons_mismatch INTEGER, PRIMARY KEY (source, row_key))')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_nok_reconciliation_source_dte ON nok_reconciliation (source, dte)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS reconciliation_sources (source TEXT PRIMARY KEY)')
+
+def reconciliation_built(cursor, source):
+    # As rollups.rollups_built : once a source has been reconciled, its later ingestions only refresh the touched weeks.
+    return table_exists(cursor, 'reconciliation_sources') and cursor.execute('select 1 from reconciliation_sources where source = ?', (source,)).fetchone() is not None
+
+def refresh_reconciliation(conn, source, incremental):
+    """
+    Args:
+        conn (sqlite3.Connection): connection to database1.db, inside the ingestion transaction of source
+        source (str): ingested table, one of RECONCILIATION_SOURCES
+        incremental (bool): rollups.track_changes was called before the ingestion, only refresh the touched weeks
+                            (otherwise, table rebuilt or not reconciled yet, every week is recomputed)
+    Returns:
+        rows_written (int): number of reconciliation rows written
+    """
+    cursor = conn.cursor()
+    create_reconciliation_tables(cursor)
+    if incremental:
+        weeks = touched_weeks(cursor, source)[source]
+        cursor.executemany('DELETE FROM nok_reconciliation WHERE source = ? AND dte >= ? AND dte < ?', [(source,) + date_bounds({'Year': year, 'Week': (week, week)}) for year, week in weeks])
+    else:
+        weeks = all_weeks(cursor, source)
+        cursor.execute('DELETE FROM nok_reconciliation WHERE source = ?', (source,))
+
+    df = compute_reconciliation(load_raw_rows(conn, source, weeks, RECONCILIATION_QUERIES), source)
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    cursor.executemany(f'INSERT INTO nok_reconciliation (source, {", ".join(RECONCILIATION_COLUMNS)}) VALUES (?, {", ".join("?" for _ in RECONCILIATION_COLUMNS)})', [(source,) + row for row in rows])
+    cursor.execute('INSERT OR IGNORE INTO reconciliation_sources (source) VALUES (?)', (source,))
+    return len(df)
+
+##############################
+# Reconciliation loading     #
+##############################
+
+@cached_loader(RECONCILIATION_CACHE)
+def load_reconciliation(input_values, source):
+    """
+    Args:
+        input_values (dict): filter values (Year, Week and Shift are applied in SQL)
+        source (str): 'uu_tracking' or 'pp_tracking'
+    Returns:
+        df (pd.DataFrame): mismatched rows of the source (RECONCILIATION_NAME), latest first, read from nok_reconciliation
+                           (computed from the tracking table until create_db.py has built it)
+    """
+    conn = get_connection('database1.db')
+    if reconciliation_built(conn.cursor(), source):
+        where = 'WHERE source = ? AND dte >= ? AND dte < ?'
+        params = [source, *date_bounds(input_values)]
+        if 'Shift' in input_values and input_values['Shift'] != 'All':
+            where += ' AND shift = ?'
+            params.append(INV_SHIFT_DICT.get(input_values['Shift'], input_values['Shift'])) # shift is stored as an integer
+        df = pd.read_sql_query(f'select {", ".join(RECONCILIATION_COLUMNS)} from nok_reconciliation {where};', conn, params=params)
+    else:
+        filtered_query, params = apply_filter_query(RECONCILIATION_QUERIES[source], input_values)
+        df = compute_reconciliation(pd.read_sql_query(filtered_query, conn, params=params), source)
+
+    df.columns = RECONCILIATION_NAME
+    df['Date'] = pd.to_datetime(df['Date'], format='ISO8601')
+    df['Shift'] = df['Shift'].map(SHIFT_DICT)
+    for column in ['Buckets Mismatch', 'Defaults Mismatch', 'CONS Mismatch']:
+        df[column] = df[column].astype(bool)
+    return df.sort_values(by=['Date', 'Shift'], ascending=[False, False], ignore_index=True)
@@ -0,0 +1,296 @@
+"""
+Module related to the weekly rollup tables of database1.db.
+
+weekly_rollup holds the OK and NOK sums, weekly_type_rollup the NOK by Type sums (raw defect names), of uu_tracking
+and pp_tracking by (source, year, week, dte_week, shift, operator, equipment, operation).
+week is the Week of the loaders (strftime('%W') for uu_tracking, production week for pp_tracking) and dte_week the
+strftime('%W') week of dte, on which the loaders' SQL filters. The rollups are maintained by create_db.py,
+one (year, dte_week) at a time, and read by the per week trend graphs instead of the tracking tables.
+"""
+
+import pandas as pd
+
+from dicts import SHIFT_DICT, INV_SHIFT_DICT, OPERATION_DICT_PP, EQUIPMENTS_PER_OPERATOR_LIST
+from utils import fix_operator, extract_type, extract_type_smc
+from smc_load import load_df_smc
+from pp_load import load_pp_operations
+from defaults import explode_defaults, DEFAULTS_CATALOG
+from features import compute_year, compute_production_week
+from filters import date_bounds
+from ofa_index import ofa_index_built, compute_ofa_index
+from cache import DataFrameCache, cached_loader
+from db import get_connection, table_exists
+
+ROLLUP_SOURCES = ['uu_tracking', 'pp_tracking']
+
+GRAIN = ['year', 'week', 'dte_week', 'shift', 'operator', 'equipment', 'operation']
+
+ROLLUP_TABLES = {
+    'weekly_rollup': GRAIN + ['ok', 'nok'],
+    'weekly_type_rollup': GRAIN + ['type', 'nok_by_type'],
+}
+
+RAW_QUERIES = {
+    'uu_tracking': "select dte, shift, usr as operator, NULL as collaborator, pdc as equipment, NULL as operation, qty_ok, qty_ko, defaults, ofa from uu_tracking ",
+    'pp_tracking': "select dte, shift, uusr as operator, usr as collaborator, NULL as equipment, ope as operation, qty_ok, qty_ko, defaults, ofa from pp_tracking ",
+}
+
+# Columns grouped on by extract_type_smc / extract_type that may be missing, the groupby of explode_type drops those rows.
+TYPE_REQUIRED_COLUMNS = {
+    'uu_tracking': ['equipment', 'ofa'],
+    'pp_tracking': ['collaborator', 'ofa'],
+}
+
+ROLLUP_CACHE = DataFrameCache('load_weekly_rollup', 'database1.db')
+
+#########################
+# Rollup maintenance    #
+#########################
+
+def create_rollup_tables(cursor):
+    for table, columns in ROLLUP_TABLES.items():
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (source TEXT, {", ".join(columns)})')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_source_year_dte_week ON {table} (source, year, dte_week)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS rollup_sources (source TEXT PRIMARY KEY)')
+
+def track_changes(cursor, table):
+    """
+    Record, for the rest of the connection, the dte and ofa of every row inserted or updated in table
+    (old and new values, an update may move a row to another week).
+    """
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS touched_rows (source TEXT, dte TEXT, ofa TEXT)')
+    cursor.execute(f"""
+        CREATE TEMP TRIGGER IF NOT EXISTS track_{table}_insert AFTER INSERT ON main.{table}
+        BEGIN INSERT INTO touched_rows VALUES ('{table}', new.dte, new.ofa); END
+    """)
+    cursor.execute(f"""
+        CREATE TEMP TRIGGER IF NOT EXISTS track_{table}_update AFTER UPDATE ON main.{table}
+        BEGIN INSERT INTO touched_rows VALUES ('{table}', old.dte, old.ofa), ('{table}', new.dte, new.ofa); END
+    """)
+
+def stop_tracking(cursor, table):
+    cursor.execute(f'DROP TRIGGER IF EXISTS temp.track_{table}_insert')
+    cursor.execute(f'DROP TRIGGER IF EXISTS temp.track_{table}_update')
+    cursor.execute('DELETE FROM touched_rows WHERE source = ?', (table,))
+
+def touched_weeks(cursor, table):
+    """
+    Returns:
+        weeks (dict): set of touched (year, dte_week) of each source, the pp_tracking weeks of the ofas touched
+                      in uu_tracking included since their Equipment comes from uu_tracking
+    """
+    year_week = "CAST(strftime('%Y', dte) AS INTEGER), CAST(strftime('%W', dte) AS INTEGER)"
+    weeks = {table: set(cursor.execute(f'select distinct {year_week} from touched_rows where source = ? and dte is not null', (table,)).fetchall())}
+    if table == 'uu_tracking' and table_exists(cursor, 'pp_tracking'):
+        weeks['pp_tracking'] = set(cursor.execute(f"""
+            select distinct {year_week} from pp_tracking
+            where dte is not null and ofa in (select ofa from touched_rows where source = ?)
+        """, (table,)).fetchall())
+    return weeks
+
+def all_weeks(cursor, source):
+    if not table_exists(cursor, source):
+        return set()
+    return set(cursor.execute(f"select distinct CAST(strftime('%Y', dte) AS INTEGER), CAST(strftime('%W', dte) AS INTEGER) from {source} where dte is not null").fetchall())
+
+def load_equipment_by_ofa(conn):
+    """
+    Read from the ofa_equipment index (see ofa_index.py), on the given connection so that the rows being ingested are seen.
+    Returns:
+        equipment_by_ofa (pd.Series): standardized Equipment of the ofas run on a single equipment, by ofa
+    """
+    cursor = conn.cursor()
+    if ofa_index_built(cursor): # Refreshed before the rollups when uu_tracking is ingested, see create_db.py
+        return pd.read_sql_query('select ofa, equipment from ofa_equipment where equipment_count = 1', conn).set_index('ofa')['equipment']
+    if not table_exists(cursor, 'uu_tracking'):
+        return pd.Series(dtype=object)
+    df_index = compute_ofa_index(pd.read_sql_query('select ofa, pdc, dte from uu_tracking', conn))
+    return df_index[df_index['equipment_count'] == 1].set_index('ofa')['equipment']
+
+def load_raw_rows(conn, source, weeks, queries=RAW_QUERIES):
+    # One query per week, each one a range search on the (dte, shift) index.
+    frames = [
+        pd.read_sql_query(queries[source] + 'WHERE dte >= ? AND dte < ?;', conn, params=date_bounds({'Year': year, 'Week': (week, week)}))
+        for year, week in sorted(weeks)
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.read_sql_query(queries[source] + 'WHERE 0;', conn)
+
+def compute_rollups(df, source, equipment_by_ofa):
+    """
+    Args:
+        df (pd.DataFrame): raw rows of load_raw_rows
+        source (str): 'uu_tracking' or 'pp_tracking'
+        equipment_by_ofa (pd.Series): see load_equipment_by_ofa (pp_tracking only)
+    Returns:
+        df_rollup, df_type_rollup (pd.DataFrame): rows of weekly_rollup and weekly_type_rollup
+    """
+    df = df[df['dte'].notna()].reset_index(drop=True)
+    df['Date'] = pd.to_datetime(df['dte']).dt.normalize()
+    df['Shift'] = df['shift']
+    df['year'] = compute_year(df)
+    df['dte_week'] = df['Date'].dt.strftime('%W').astype(int)
+    df['week'] = compute_production_week(df) if source == 'pp_tracking' else df['dte_week']
+    df['operator'] = df['operator'].fillna('NA')
+    if source == 'pp_tracking':
+        df['equipment'] = df['ofa'].map(equipment_by_ofa).astype(str) # 'nan' when not found, as in load_pp_data
+    df['ok'], df['nok'] = df['qty_ok'], df['qty_ko']
+
+    df_rollup = df.groupby(GRAIN, as_index=False, dropna=False, observed=True)[['ok', 'nok']].sum()
+
+    typed = df[TYPE_REQUIRED_COLUMNS[source]].notna().all(axis=1) & df['shift'].isin(SHIFT_DICT)
+    if source == 'pp_tracking':
+        typed &= pd.to_numeric(df['operation'], errors='coerce').isin(OPERATION_DICT_PP)
+    df_typed = df[typed].reset_index(drop=True)
+    df_long = explode_defaults(df_typed['defaults'])
+    df_type = df_typed[GRAIN].take(df_long['row_id'].values).reset_index(drop=True)
+    df_type['type'] = df_long['Type'].values
+    df_type['nok_by_type'] = df_long['NOK by Type'].values
+    df_type_rollup = df_type.groupby(GRAIN + ['type'], as_index=False, dropna=False, observed=True)['nok_by_type'].sum()
+
+    return df_rollup, df_type_rollup
+
+def refresh_rollups(conn, source, weeks, equipment_by_ofa=None):
+    """
+    Recompute the rollups of the given weeks of a source, inside the caller's transaction.
+    Args:
+        conn (sqlite3.Connection): connection to database1.db
+        source (str): 'uu_tracking' or 'pp_tracking'
+        weeks (set): (year, dte_week) to recompute
+        equipment_by_ofa (pd.Series): see load_equipment_by_ofa, loaded when not given
+    Returns:
+        rows_written (int): number of rollup rows written
+    """
+    cursor = conn.cursor()
+    create_rollup_tables(cursor)
+    if not weeks:
+        return 0
+    if source == 'pp_tracking' and equipment_by_ofa is None:
+        equipment_by_ofa = load_equipment_by_ofa(conn)
+
+    rows_written = 0
+    rollups = compute_rollups(load_raw_rows(conn, source, weeks), source, equipment_by_ofa)
+    for (table, columns), df in zip(ROLLUP_TABLES.items(), rollups):
+        cursor.executemany(f'DELETE FROM {table} WHERE source = ? AND year = ? AND dte_week = ?', [(source, year, week) for year, week in weeks])
+        rows = df[columns].astype(object).where(df[columns].notna(), None).itertuples(index=False, name=None)
+        cursor.executemany(f'INSERT INTO {table} (source, {", ".join(columns)}) VALUES (?, {", ".join("?" for _ in columns)})', [(source,) + row for row in rows])
+        rows_written += len(df)
+    return rows_written
+
+def rollups_built(cursor, source):
+    # A source is built once all of its weeks have been rolled up, its later ingestions only refresh the touched weeks.
+    return table_exists(cursor, 'rollup_sources') and cursor.execute('select 1 from rollup_sources where source = ?', (source,)).fetchone() is not None
+
+def refresh_after_ingest(conn, table, incremental):
+    """
+    Args:
+        conn (sqlite3.Connection): connection to database1.db
+        table (str): ingested table, one of ROLLUP_SOURCES
+        incremental (bool): track_changes was called before the ingestion, only refresh the touched weeks
+                            (otherwise, table rebuilt or not built yet, every week is recomputed)
+    Returns:
+        rows_written (int): number of rollup rows written
+    """
+    cursor = conn.cursor()
+    if incremental:
+        weeks = touched_weeks(cursor, table)
+        stop_tracking(cursor, table)
+    else:
+        weeks = {table: all_weeks(cursor, table)}
+        if table == 'uu_tracking':
+            weeks['pp_tracking'] = all_weeks(cursor, 'pp_tracking')
+
+    rows_written = 0
+    for source, source_weeks in weeks.items():
+        if not rollups_built(cursor, source): # e.g. pp_tracking weeks touched by a uu_tracking ingestion before pp_tracking was built
+            source_weeks = all_weeks(cursor, source)
+        rows_written += refresh_rollups(conn, source, source_weeks)
+        cursor.execute('INSERT OR IGNORE INTO rollup_sources (source) VALUES (?)', (source,))
+    return rows_written
+
+#########################
+# Rollup loading        #
+#########################
+
+def covers_filters(input_values):
+    """
+    Returns:
+        covered (bool): True when every filter of input_values is at the rollup grain (Weekday and
+                        Equipments per Operator are only supported left to their default, no filtering, value)
+    """
+    weekdays = input_values.get('Weekday')
+    equipments_per_operator = input_values.get('Equipments per Operator', EQUIPMENTS_PER_OPERATOR_LIST)
+    return (not weekdays or len(set(weekdays)) == 7) and equipments_per_operator == EQUIPMENTS_PER_OPERATOR_LIST
+
+@cached_loader(ROLLUP_CACHE)
+def load_weekly_rollup(input_values, source, operations=None):
+    """
+    Args:
+        input_values (dict): filter values (Year, Week and Shift are applied in SQL, on dte_week as the loaders do)
+        source (str): 'uu_tracking' or 'pp_tracking'
+        operations (tuple): operations to keep (pp_tracking only)
+    Returns:
+        df, df_type (pd.DataFrame): 'OK' and 'NOK', and 'NOK by Type' by Year, Week, Shift, Operator, Equipment
+                                    and Operation, with the values of load_df_smc / load_pp_data
+    """
+    where = 'WHERE source = ? AND year = ? AND dte_week BETWEEN ? AND ?'
+    start_week, end_week = input_values['Week']
+    params = [source, int(input_values['Year']), start_week, end_week]
+    if 'Shift' in input_values and input_values['Shift'] != 'All':
+        where += ' AND shift = ?'
+        params.append(INV_SHIFT_DICT.get(input_values['Shift'], input_values['Shift'])) # shift is stored as an integer
+    if operations:
+        where += ' AND operation IN ({})'.format(', '.join('?' for _ in operations))
+        params.extend(operations)
+
+    conn = get_connection('database1.db')
+    df = pd.read_sql_query(f'select {", ".join(ROLLUP_TABLES["weekly_rollup"])} from weekly_rollup {where};', conn, params=params)
+    df_type = pd.read_sql_query(f'select {", ".join(ROLLUP_TABLES["weekly_type_rollup"])} from weekly_type_rollup {where};', conn, params=params)
+
+    # Same cleaning as the loaders, on a few hundred rows.
+    operators_set = set(df['operator'])
+    for frame in (df, df_type):
+        frame.rename(columns={'year': 'Year', 'week': 'Week', 'shift': 'Shift', 'operator': 'Operator', 'equipment': 'Equipment', 'operation': 'Operation', 'ok': 'OK', 'nok': 'NOK', 'type': 'Type', 'nok_by_type': 'NOK by Type'}, inplace=True)
+        frame['Operator'] = frame['Operator'].apply(lambda x: fix_operator(x, operators_set))
+        frame['Shift'] = frame['Shift'].map(SHIFT_DICT)
+        frame['Operation'] = pd.to_numeric(frame['Operation'], errors='coerce').map(OPERATION_DICT_PP)
+    defaults_dict = DEFAULTS_CATALOG.descriptions()
+    df_type['Type'] = df_type['Type'].map(lambda x: defaults_dict.get(x, x))
+
+    columns = ['Year', 'Week', 'Shift', 'Operator', 'Equipment', 'Operation']
+    df = df.groupby(columns, as_index=False, dropna=False, observed=True)[['OK', 'NOK']].sum()
+    df_type = df_type.groupby(['Type'] + columns, as_index=False, dropna=False, observed=True)[['NOK by Type']].sum()
+    return df, df_type
+
+def rollups_ready(source):
+    # The rollups only exist once create_db.py has run, the trend graphs read the tracking tables until then.
+    return rollups_built(get_connection('database1.db').cursor(), source)
+
+def load_weekly_smc(input_values):
+    """
+    Args:
+        input_values (dict): filter values of a per week graph
+    Returns:
+        df, df_type (pd.DataFrame): uu_tracking OK, NOK and NOK by Type, from the rollups when they cover the filters
+                                    (otherwise load_df_smc and extract_type_smc), to be filtered with filter_dataframe
+    """
+    if covers_filters(input_values) and rollups_ready('uu_tracking'):
+        return load_weekly_rollup(input_values, 'uu_tracking')
+    df = load_df_smc(input_values)
+    return df, extract_type_smc(df)
+
+def load_weekly_operations(input_values, operations):
+    """
+    Args:
+        input_values (dict): filter values of a per week graph
+        operations (iterable): operations to load, e.g. ['20', '100']
+    Returns:
+        df_by_operation (dict): (df, df_type) of each requested operation, as load_weekly_smc for pp_tracking
+    """
+    operations = tuple(sorted(set(operations), key=int))
+    if not (covers_filters(input_values) and rollups_ready('pp_tracking')):
+        return {operation: (df, extract_type(df)) for operation, df in load_pp_operations(input_values, operations).items()}
+    df, df_type = load_weekly_rollup(input_values, 'pp_tracking', operations)
+    return {operation: (df[df['Operation'] == operation], df_type[df_type['Operation'] == operation]) for operation in operations}
+
+def load_weekly_operation(input_values, operation):
+    return load_weekly_operations(input_values, [operation])[operation]
@@ -0,0 +1,39 @@
+"""
+Module related to the startup time of the dashboard.
+
+Every callback has to be registered before the first page is served (the browser reads them all at once),
+so the page modules are imported at startup. What they only need to draw a graph is imported with lazy_import
+instead : the module is imported the first time one of its attributes is used, i.e. when the page is first requested.
+The import times are measured by benchmarks/bench_startup.py.
+"""
+
+import sys, importlib, threading
+
+class LazyModule:
+    """
+    Stands for a module until its first attribute access, which imports it. Unlike importlib.util.LazyLoader (not
+    thread-safe before Python 3.12), the module is only put in sys.modules once fully executed, by the import system,
+    so the threads of a gthread worker requesting the page at the same time all get the whole module.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+def lazy_import(name):
+    """
+    Args:
+        name (str): module to import, e.g. 'plotly.express'
+    Returns:
+        module (LazyModule or module): the module, imported on first attribute access (already imported modules are returned as is)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
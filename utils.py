@@ -1,7 +1,11 @@
-import calendar, json, re, psycopg2, ast, hashlib, sqlite3
+import calendar, json, re, psycopg2
 
 import pandas as pd, numpy as np
 
+from defaults import explode_type, DEFAULTS_CATALOG
+from cache import DataFrameCache
+from db import get_connection
+
 PASSWORD = "?admin"
 
 ###############
@@ -10,37 +14,39 @@ PASSWORD = "?admin"
 
 SMC_NAME = ["Number", "Operator", "Date", "Shift", "Equipment", "OK", "NOK", 'A', 'C', 'O', 'R', 'M', 'U', 'd6', "Comments", "ofa", 'YW'] # Names of the columns we extract
 
-def load_operator_label():
-    conn = sqlite3.connect('database1.db')
-    query = """
-                select distinct usr
-                from uu_tracking 
-            """
-
-    # Execute the query and load data into a DataFrame
-    df = pd.read_sql_query(query, conn) 
+LABEL_CACHE = DataFrameCache('label_catalog', 'database1.db', maxsize=1)
 
-    # Close the connection
-    conn.close()
+def load_label_catalog():
+    """
+    Returns:
+        operators, equipments (tuple): distinct usr and pdc of uu_tracking, read in one query from the
+                                       (usr, pdc) index and cached until database1.db changes
+    """
+    version = LABEL_CACHE.current_version()
+    catalog = LABEL_CACHE.get('labels')
+    if catalog is None:
+        conn = get_connection('database1.db')
+        query = """
+                    select distinct usr, pdc
+                    from uu_tracking 
+                """
+
+        # Execute the query and load data into a DataFrame
+        df = pd.read_sql_query(query, conn) 
+
+        catalog = tuple(tuple(sorted(i for i in df[column].unique() if isinstance(i, str))) for column in ['usr', 'pdc'])
+        LABEL_CACHE.set('labels', catalog, version)
+    return catalog
 
-    operator_label = [{'label': 'All Operators', 'value': 'All'}] + [{'label': i, 'value': i} for i in df['usr'] if isinstance(i, str)]
+def load_operator_label():
+    operators, _ = load_label_catalog()
+    operator_label = [{'label': 'All Operators', 'value': 'All'}] + [{'label': i, 'value': i} for i in operators]
 
     return operator_label
 
 def load_equipment_label():
-    conn = sqlite3.connect('database1.db')
-    query = """
-                select distinct pdc
-                from uu_tracking 
-            """
-
-    # Execute the query and load data into a DataFrame
-    df = pd.read_sql_query(query, conn) 
-
-    # Close the connection
-    conn.close()
-
-    equipment_label = [{'label': 'All Equipments', 'value': 'All'}] + [{'label': i, 'value': i} for i in df['pdc'] if isinstance(i, str)]
+    _, equipments = load_label_catalog()
+    equipment_label = [{'label': 'All Equipments', 'value': 'All'}] + [{'label': i, 'value': i} for i in equipments]
     
     return equipment_label
 
@@ -61,6 +67,16 @@ def fix_operator(operator, operators_set):
             return operator[1:]
     return operator
 
+def fix_operators(operators):
+    """
+    Args:
+        operators (pd.Series): operator names, without missing values
+    Returns:
+        operators (pd.Series): fix_operator applied once per distinct name
+    """
+    operators_set = set(operators)
+    return operators.map({operator: fix_operator(operator, operators_set) for operator in operators_set})
+
 def assign_team(df):
     if df['Operator'] in ['WWW', 'DRD', 'ESI']:
         return 3
@@ -122,118 +138,13 @@ def str_to_dict(dict_string):
         return {}
 
 def extract_type_smc(df):
-    new_data = []
-    for _, row in df.iterrows():
-        if isinstance(row['Type'], str):
-            if row['Type'].strip():  # Check if the string is not empty
-                try:
-                    nok_dict = ast.literal_eval(row['Type'])
-                except (SyntaxError, ValueError) as e:
-                    print(f"Error for row['Type']: {row['Type']} - {e}")
-                    continue  # Skip the row if there's an error
-            else:
-                continue  # Skip the row if the string is empty
-        else:
-            nok_dict = row['Type']
-        
-        for type, nok_qty in {**nok_dict}.items():
-            year = row['Year']
-            week = row['Week']
-            date = row['Date']
-            equipment = row['Equipment']
-            operator = row['Operator']
-            shift = row['Shift']
-            weekday = row['Weekday']
-            ofa = row['ofa']
-            ok = row['OK']
-            nok = row['NOK']
-            new_data.append([type, nok_qty if type in row['Type'] else 0, year, week, date, equipment, operator, shift, weekday, ofa, ok, nok])
-    
-    df_Type = pd.DataFrame(new_data, columns=['Type', 'NOK by Type', 'Year', 'Week', 'Date', 'Equipment', 'Operator', 'Shift', 'Weekday', 'ofa', 'OK', 'NOK'])
-    df_Type = df_Type.groupby(['Type', 'Year', 'Week', 'Date', 'Equipment', 'Operator', 'Shift', 'Weekday', 'ofa'], as_index=False).sum()
-    return df_Type
+    return explode_type(df, ['Year', 'Week', 'Date', 'Equipment', 'Operator', 'Shift', 'Weekday', 'ofa'], DEFAULTS_CATALOG.descriptions())
 
 def extract_type(df):
-    new_data = []
-    for _, row in df.iterrows():
-        if isinstance(row['Type'], str):
-            if row['Type'].strip():  # Check if the string is not empty
-                try:
-                    nok_dict = ast.literal_eval(row['Type'])
-                except (SyntaxError, ValueError) as e:
-                    print(f"Error for row['Type']: {row['Type']} - {e}")
-                    continue  # Skip the row if there's an error
-            else:
-                continue  # Skip the row if the string is empty
-        else:
-            nok_dict = row['Type']
-        
-        for type, nok_qty in {**nok_dict}.items():
-            year = row['Year']
-            week = row['Week']
-            operation = row['Operation']
-            equipment = row['Equipment']
-            operator = row['Operator']
-            collaborator = row['Collaborator']
-            shift = row['Shift']
-            weekday = row['Weekday']
-            ofa = row['ofa']
-            ok = row['OK']
-            nok = row['NOK']
-            new_data.append([type, nok_qty if type in row['Type'] else 0, year, week, operation, equipment, operator, collaborator, shift, weekday, ofa, ok, nok])
-    
-    df_Type = pd.DataFrame(new_data, columns=['Type', 'NOK by Type', 'Year', 'Week', 'Operation', 'Equipment', 'Operator', 'Collaborator', 'Shift', 'Weekday', 'ofa', 'OK', 'NOK'])
-    df_Type = df_Type.groupby(['Type', 'Year', 'Week', 'Operation', 'Equipment', 'Operator', 'Collaborator', 'Shift', 'Weekday', 'ofa'], as_index=False).sum()
-    return df_Type
-
-def string_to_hex_color(s):
-    # Convert the string to a hash
-    hash_object = hashlib.md5(s.encode())
-    # Get the hexadecimal representation of the hash
-    hex_dig = hash_object.hexdigest()
-    # Take the first 6 characters to form a hex color code
-    hex_color = '#' + hex_dig[:6]
-    return hex_color
-
+    return explode_type(df, ['Year', 'Week', 'Operation', 'Equipment', 'Operator', 'Collaborator', 'Shift', 'Weekday', 'ofa'], DEFAULTS_CATALOG.descriptions())
 
 def returns_defaults_color_dict() -> dict:
-    # Initialize an empty dictionary
-    DEFAULTS_COLOR_DICT = {}
-
-    conn = sqlite3.connect('database1.db')
-
-    query = """
-                select distinct def_descr
-                from prod_defaults 
-            """
-
-    # Execute the query and load data into a DataFrame
-    df = pd.read_sql_query(query, conn) 
-
-    # Close the connection
-    conn.close()
-
-    DEFAULTS_COLOR_DICT = {value: string_to_hex_color(value) for value in df['def_descr']}
-
-    return DEFAULTS_COLOR_DICT
+    return DEFAULTS_CATALOG.colors()
 
 def returns_defaults_dict() -> dict:
-    # Initialize an empty dictionary
-    DEFAULTS_DICT = {}
-
-    conn = sqlite3.connect('database1.db')
-
-    query = """
-                select def_name, def_descr
-                from prod_defaults 
-            """
-
-    # Execute the query and load data into a DataFrame
-    df = pd.read_sql_query(query, conn) 
-
-    # Close the connection
-    conn.close()
-
-    DEFAULTS_DICT = {row['def_name']: row['def_descr'] for _, row in df.iterrows()}
-
-    return DEFAULTS_DICT
\ No newline at end of file
+    return DEFAULTS_CATALOG.descriptions()
\ No newline at end of file
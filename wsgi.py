@@ -0,0 +1,48 @@
+"""
+Module related to serving the dashboard in production, with a multi-worker WSGI server.
+
+    gunicorn wsgi:server    (settings in gunicorn.conf.py : DASHBOARD_WORKERS processes of DASHBOARD_THREADS threads)
+    python wsgi.py          (waitress, one process of DASHBOARD_THREADS threads, e.g. on Windows)
+
+Both listen on DASHBOARD_BIND (0.0.0.0:8180 by default), with debug off.
+
+Importing this module builds the app and warms the label and defaults catalogs and the loaders cache for the
+default filters, so that with preload_app every gunicorn worker is forked from an app that is already built.
+"""
+
+import os, datetime
+
+from app import app, server
+from homepage.homepage_layout import home_layout
+from pre_ten.pre_ten_layout import pre_ten_layout
+from post_twenty.post_twenty_layout import post_twenty_layout
+from overall_scrap.overall_scrap_layout import overall_scrap_layout
+from utils import load_label_catalog
+from defaults import DEFAULTS_CATALOG
+from ofa_index import load_ofa_index
+from smc_load import load_df_smc
+from db import close_connections
+
+def warm_up():
+    load_label_catalog()
+    DEFAULTS_CATALOG.refresh()
+    load_ofa_index()
+    for operator_show in (True, False):
+        pre_ten_layout(operator_show)
+        overall_scrap_layout(operator_show)
+    home_layout()
+    post_twenty_layout()
+    # Default week ranges of the graphs, see the layouts
+    current_year = datetime.datetime.now().year
+    current_week = datetime.datetime.now().isocalendar()[1]
+    for weeks in ([1, current_week], [max(1, current_week - 1), current_week]):
+        load_df_smc({'Year': current_year, 'Week': weeks, 'Shift': 'All'})
+    # The workers open their own connections
+    close_connections()
+
+warm_up()
+
+if __name__ == '__main__':
+    from waitress import serve
+    host, port = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8180').rsplit(':', 1)
+    serve(server, host=host, port=int(port), threads=int(os.environ.get('DASHBOARD_THREADS', 8)))